@@ -0,0 +1,101 @@
+"""
+In-process free-spot allocator used by reserve_spot.
+
+Keeps one free list per lot so a spot can be handed out in O(1) instead of
+scanning parking_spot for the first 'A' row. Picks are random, so concurrent
+requests for the same lot land on different spots rather than all racing for
+the lowest id. The parking_spot.status column remains the source of truth:
+callers confirm every candidate against the database, and a lot whose list
+runs dry (or turns out to be stale) is reloaded from the table.
+"""
+import random
+import threading
+
+from models import ParkingSpot
+
+
+class SpotAllocator:
+    """Per-lot free lists with O(1) random acquire and O(1) release"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._free = {}   # lot_id -> list of free spot ids
+        self._slots = {}  # lot_id -> {spot_id: position in the free list}
+
+    def rebuild(self):
+        """Reload the free lists of every lot from parking_spot (run at startup)"""
+        rows = ParkingSpot.query.with_entities(ParkingSpot.lot_id, ParkingSpot.id) \
+            .filter_by(status='A').all()
+        free = {}
+        for lot_id, spot_id in rows:
+            free.setdefault(lot_id, []).append(spot_id)
+
+        with self._lock:
+            self._free = free
+            self._slots = {lot_id: {spot_id: i for i, spot_id in enumerate(ids)} for lot_id, ids in free.items()}
+
+    def load_lot(self, lot_id):
+        """Reload a single lot's free list from parking_spot"""
+        lot_id = int(lot_id)
+        ids = [spot_id for (spot_id,) in ParkingSpot.query.with_entities(ParkingSpot.id)
+               .filter_by(lot_id=lot_id, status='A').all()]
+
+        with self._lock:
+            self._free[lot_id] = ids
+            self._slots[lot_id] = {spot_id: i for i, spot_id in enumerate(ids)}
+
+    def acquire(self, lot_id):
+        """Remove and return a random free spot id for the lot, or None when it is full"""
+        lot_id = int(lot_id)
+        with self._lock:
+            if lot_id in self._free:
+                spot_id = self._pop_random(lot_id)
+                if spot_id is not None:
+                    return spot_id
+
+        # Unknown or exhausted lot: other workers may have freed spots, so consult the table
+        self.load_lot(lot_id)
+        with self._lock:
+            return self._pop_random(lot_id)
+
+    def release(self, lot_id, spot_id):
+        """Return a spot to its lot's free list"""
+        lot_id = int(lot_id)
+        with self._lock:
+            if lot_id not in self._free:
+                return  # Lot not loaded yet; it will be read from the table on first use
+            slots = self._slots[lot_id]
+            if spot_id not in slots:
+                slots[spot_id] = len(self._free[lot_id])
+                self._free[lot_id].append(spot_id)
+
+    def invalidate(self, lot_id):
+        """Forget a lot so its free list is rebuilt from the table on next acquire"""
+        lot_id = int(lot_id)
+        with self._lock:
+            self._free.pop(lot_id, None)
+            self._slots.pop(lot_id, None)
+
+    def free_count(self, lot_id):
+        """Number of spots currently held in a lot's free list"""
+        with self._lock:
+            return len(self._free.get(int(lot_id), ()))
+
+    def _pop_random(self, lot_id):
+        # Swap a random entry with the tail and pop it; caller holds the lock
+        ids = self._free.get(lot_id)
+        if not ids:
+            return None
+        slots = self._slots[lot_id]
+        i = random.randrange(len(ids))
+        spot_id = ids[i]
+        last = ids.pop()
+        if last != spot_id:
+            ids[i] = last
+            slots[last] = i
+        del slots[spot_id]
+        return spot_id
+
+
+# Shared allocator instance for the application process
+spot_allocator = SpotAllocator()
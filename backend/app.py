@@ -1,9 +1,15 @@
+import os
 from flask import Flask, jsonify
 from config import Config
 from models import db, User, ParkingLot, ParkingSpot
 from flask_cors import CORS
+from flask_migrate import Migrate, upgrade
 from tasks import send_email_task, send_reservation_confirmation, send_welcome_email
 from demo_data import seed_demo_data
+from allocator import spot_allocator
+from suggest import suggest_index
+from pagination import InvalidCursor, NEXT_CURSOR_HEADER
+from serializers import FastJSONProvider
 
 from routes.auth_routes import register_auth_routes
 from routes.api_routes import register_api_routes
@@ -13,13 +19,21 @@ from routes.user_routes import register_user_routes
 # Initialize Flask application instance
 app = Flask(__name__)
 app.config.from_object(Config)
+# jsonify() through orjson when it is installed
+app.json = FastJSONProvider(app)
 # Configure CORS to allow frontend connections from common development ports
 CORS(app, origins=["http://localhost:5173", "http://localhost:3000", "http://localhost:8080"], 
      allow_headers=["Content-Type", "Authorization"], 
-     methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"])
+     methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
+     expose_headers=[NEXT_CURSOR_HEADER])
 
-# Initialize database connection
+# Initialize database connection; schema changes are applied through versioned migrations
 db.init_app(app)
+migrate = Migrate(app, db, directory=os.path.join(os.path.dirname(__file__), 'migrations'), render_as_batch=True)
+
+@app.errorhandler(InvalidCursor)
+def invalid_cursor(error):
+    return jsonify({'message': str(error)}), 400
 
 @app.route('/')
 def home():
@@ -95,7 +109,7 @@ def celery_status():
 @app.route('/setup')
 def setup_db():
     """Initialize database and create admin user"""
-    db.create_all()
+    upgrade()
     
     if not User.query.filter_by(username='admin').first():
         admin = User(username='admin', email='admin@test.com', phone_number='9999999999', address='Admin Office', pincode='000000', role='admin')
@@ -105,14 +119,18 @@ def setup_db():
         print("✅ Admin user created!")
     
     seed_demo_data(force_reset=False)
+    spot_allocator.rebuild()
+    suggest_index.announce_rebuild()
     
     return "Database setup complete! Demo data ensured."
 
 @app.route('/setup-demo')
 def setup_demo():
     """Force refresh the demo dataset."""
-    db.create_all()
+    upgrade()
     seed_demo_data(force_reset=True)
+    spot_allocator.rebuild()
+    suggest_index.announce_rebuild()
     return "Demo dataset recreated successfully."
 
 @app.route('/debug')
@@ -153,10 +171,13 @@ register_api_routes(app)
 register_admin_routes(app)
 register_user_routes(app)
 
+# Load the type-ahead index in the background; suggest() never waits on the database
+suggest_index.start(app)
+
 if __name__ == '__main__':
     try:
         with app.app_context():
-            db.create_all()    
+            upgrade()  # Apply any pending migrations from migrations/versions
             if not User.query.filter_by(username='admin').first():
                 admin = User(username='admin', email='admin@test.com', phone_number='9999999999', address='Admin Office', pincode='000000', role='admin')
                 admin.set_password('admin123')
@@ -164,6 +185,9 @@ if __name__ == '__main__':
                 db.session.commit()
                 print("✅ Admin user created successfully!")
             seed_demo_data(force_reset=False)
+            # Prime the in-memory free-spot lists, and reload the type-ahead index over the seeded lots
+            spot_allocator.rebuild()
+            suggest_index.invalidate()
         
         print("ParkIndia Server starting on http://localhost:5000")
         app.run(debug=True, host='0.0.0.0', port=5000)
@@ -1,17 +1,15 @@
 import jwt
-import bcrypt
+import time
 from datetime import datetime, timedelta
 from functools import wraps
 from flask import request, jsonify, current_app
 from models import User
-
-def hash_password(password):
-    """Generate bcrypt hash for password storage"""
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+from password_hashing import hash_password, check_password
+from token_cache import token_digest, cached_payload, admit, revoke, record_auth
 
 def verify_password(password, hashed_password):
     """Compare plain password with stored hash"""
-    return bcrypt.checkpw(password.encode('utf-8'), hashed_password.encode('utf-8'))
+    return check_password(password, hashed_password)
 
 def generate_token(user_id, username, role):
     """Create JWT access token with user information and expiration"""
@@ -25,14 +23,30 @@ def generate_token(user_id, username, role):
     return jwt.encode(payload, current_app.config['JWT_SECRET_KEY'], algorithm='HS256')
 
 def verify_token(token):
-    """Validate JWT token and extract payload"""
+    """Validate JWT token and extract payload; tokens verified before are answered from the token cache"""
+    started = time.perf_counter()
+    digest = token_digest(token)
+    payload = cached_payload(digest)
+    if payload is not None:
+        record_auth('hit', started)
+        return payload
     try:
         payload = jwt.decode(token, current_app.config['JWT_SECRET_KEY'], algorithms=['HS256'])
-        return payload
     except jwt.ExpiredSignatureError:
+        record_auth('invalid', started)
         return None  # Token has expired
     except jwt.InvalidTokenError:
+        record_auth('invalid', started)
         return None  # Token is malformed or invalid
+    if not admit(digest, payload):
+        record_auth('revoked', started)
+        return None  # Token was revoked by logging out
+    record_auth('miss', started)
+    return payload
+
+def revoke_token(token, expires):
+    """Reject token on every worker until it expires (expires is its exp claim)"""
+    revoke(token_digest(token), expires)
 
 def token_required(f):
     """Decorator to enforce JWT authentication on routes"""
@@ -47,22 +61,46 @@ def token_required(f):
             except:
                 return jsonify({'message': 'Invalid token format'}), 401
         
-        if not token:
-            return jsonify({'message': 'Token is missing'}), 401
+        error = _authenticate(token)
+        if error:
+            return error
         
-        # Verify token and attach user info to request object
-        payload = verify_token(token)
-        if not payload:
-            return jsonify({'message': 'Token is invalid or expired'}), 401
+        return f(*args, **kwargs)
+    
+    return decorated
+
+def query_token_required(f):
+    """Like token_required, but also accepts the token as ?token= for clients that cannot set headers (EventSource)"""
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        token = request.args.get('token')
+        if not token and 'Authorization' in request.headers:
+            token = request.headers['Authorization'].split(" ")[-1]
         
-        request.user_id = payload['user_id']
-        request.username = payload['username']
-        request.user_role = payload['role']
+        error = _authenticate(token)
+        if error:
+            return error
         
         return f(*args, **kwargs)
     
     return decorated
 
+def _authenticate(token):
+    """Verify token and attach user info to request object; returns an error response on failure"""
+    if not token:
+        return jsonify({'message': 'Token is missing'}), 401
+    
+    payload = verify_token(token)
+    if not payload:
+        return jsonify({'message': 'Token is invalid or expired'}), 401
+    
+    request.user_id = payload['user_id']
+    request.username = payload['username']
+    request.user_role = payload['role']
+    request.token = token
+    request.token_expires = payload['exp']
+    return None
+
 def admin_required(f):
     """Decorator to restrict route access to administrators only"""
     @wraps(f)
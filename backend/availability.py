@@ -0,0 +1,147 @@
+"""
+Redis-resident live availability: one hash of lot_id -> free spot count.
+
+The public lot listing reads free counts from here instead of the database.
+Bookings shift the counts with HINCRBY after their transaction commits, and
+reconcile_availability() (run periodically by Celery) rewrites the hash from
+parking_spot, so the counts are exact to within the reconciliation window
+even if an update is lost (crash between commit and HINCRBY, Redis restart).
+
+Every change is also published on AVAILABILITY_CHANNEL for the live
+availability stream (see availability_stream.py).
+
+The hash carries a marker field once fully loaded. Increments only touch
+fields that already exist, so a hash that was evicted or flushed is never
+rebuilt from deltas alone; the next reader reloads it from the database.
+"""
+import json
+
+from flask import current_app
+from sqlalchemy import func
+
+from cache import cache_invalidate, redis_client
+from models import ParkingLot, ParkingSpot
+
+AVAILABILITY_KEY = "lots:available"
+LOADED_FIELD = "_loaded"
+# Bumped whenever the counts change, so listings built on them can be revalidated by version
+AVAILABILITY_NAMESPACE = "api:availability"
+# Pub/sub channel carrying every committed change to the counts
+AVAILABILITY_CHANNEL = "availability:changes"
+
+# HINCRBY for each (lot_id, delta) pair, skipping lots the hash does not hold;
+# returns the new counts as a flat [lot_id, free, ...] list
+_adjust_script = redis_client.register_script("""
+local counts = {}
+for i = 1, #ARGV, 2 do
+  if redis.call('HEXISTS', KEYS[1], ARGV[i]) == 1 then
+    counts[#counts + 1] = ARGV[i]
+    counts[#counts + 1] = redis.call('HINCRBY', KEYS[1], ARGV[i], ARGV[i + 1])
+  end
+end
+return counts
+""")
+
+
+def _publish(**message):
+    # {'lots': [changes]} for individual lots, {'resync': True} when counts changed wholesale
+    redis_client.publish(AVAILABILITY_CHANNEL, json.dumps(message))
+
+
+def _count_free_spots():
+    # Served by the (lot_id, status) index
+    counts = dict(ParkingSpot.query.with_entities(ParkingSpot.lot_id, func.count(ParkingSpot.id))
+                  .filter(ParkingSpot.status == 'A').group_by(ParkingSpot.lot_id).all())
+    return {lot_id: counts.get(lot_id, 0) for (lot_id,) in ParkingLot.query.with_entities(ParkingLot.id)}
+
+
+def load_availability():
+    """Rewrite the hash from parking_spot; returns {lot_id: free count}"""
+    counts = _count_free_spots()
+    pipe = redis_client.pipeline()
+    pipe.delete(AVAILABILITY_KEY)
+    pipe.hset(AVAILABILITY_KEY, mapping={LOADED_FIELD: 1, **{str(lot_id): free for lot_id, free in counts.items()}})
+    pipe.execute()
+    return counts
+
+
+def free_counts():
+    """{lot_id: free spots} from Redis, loading the hash on first use; falls back to the lot counters"""
+    try:
+        values = redis_client.hgetall(AVAILABILITY_KEY)
+        if LOADED_FIELD not in values:
+            return load_availability()
+        return {int(field): int(value) for field, value in values.items() if field != LOADED_FIELD}
+    except Exception as e:
+        current_app.logger.error(f"Availability read error: {e}")
+        return dict(ParkingLot.query.with_entities(ParkingLot.id, ParkingLot.available_spots).all())
+
+
+def adjust_availability(deltas):
+    """Apply committed {lot_id: change in free spots} deltas atomically"""
+    args = []
+    for lot_id, delta in deltas.items():
+        if delta:
+            args += [str(lot_id), int(delta)]
+    if not args:
+        return
+    try:
+        result = _adjust_script(keys=[AVAILABILITY_KEY], args=args)
+        counts = dict(zip(result[::2], result[1::2]))
+        changes = []
+        for lot_id, delta in deltas.items():
+            if delta:
+                change = {'lot_id': lot_id, 'delta': delta}
+                if str(lot_id) in counts:
+                    change['available_spots'] = int(counts[str(lot_id)])
+                changes.append(change)
+        _publish(lots=changes)
+    except Exception as e:
+        # The periodic reconciliation repairs whatever this misses
+        current_app.logger.error(f"Availability update error: {e}")
+
+
+def set_availability(lot_id, free):
+    """Overwrite one lot's count after an admin change (only once the hash is loaded)"""
+    try:
+        if redis_client.hexists(AVAILABILITY_KEY, LOADED_FIELD):
+            redis_client.hset(AVAILABILITY_KEY, str(lot_id), int(free))
+        _publish(lots=[{'lot_id': lot_id, 'available_spots': int(free)}])
+    except Exception as e:
+        current_app.logger.error(f"Availability update error: {e}")
+
+
+def remove_availability(lot_id):
+    """Drop a deleted lot from the hash"""
+    try:
+        redis_client.hdel(AVAILABILITY_KEY, str(lot_id))
+        _publish(lots=[{'lot_id': lot_id, 'removed': True}])
+    except Exception as e:
+        current_app.logger.error(f"Availability update error: {e}")
+
+
+def reset_availability():
+    """Drop the hash after a bulk change so the next reader reloads it"""
+    try:
+        redis_client.delete(AVAILABILITY_KEY)
+        _publish(resync=True)
+    except Exception as e:
+        current_app.logger.error(f"Availability update error: {e}")
+
+
+def reconcile_availability():
+    """Compare the hash with parking_spot, rewrite it, and return the number of lots that had drifted"""
+    counts = _count_free_spots()
+    try:
+        cached = redis_client.hgetall(AVAILABILITY_KEY)
+    except Exception as e:
+        current_app.logger.error(f"Availability read error: {e}")
+        return 0
+    drifted = sum(1 for lot_id, free in counts.items() if cached.get(str(lot_id)) != str(free))
+    drifted += sum(1 for field in cached if field != LOADED_FIELD and int(field) not in counts)
+    if drifted or LOADED_FIELD not in cached:
+        load_availability()
+    if drifted:
+        cache_invalidate(AVAILABILITY_NAMESPACE)
+        _publish(resync=True)
+    return drifted
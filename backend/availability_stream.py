@@ -0,0 +1,118 @@
+"""
+Live lot availability pushed to clients as server-sent events.
+
+Each process runs one subscriber thread on AVAILABILITY_CHANNEL and appends
+what it receives to a short in-memory log; every open stream waits on a
+shared condition and forwards the entries it has not sent yet. An idle
+connection therefore costs one waiting request thread (a greenlet under
+gevent/eventlet workers) and no Redis connection of its own, however many
+clients are listening.
+
+A stream opens with a snapshot of every lot's free count, then sends an
+event per committed change. When a client falls further behind than the log
+holds, or the subscriber had to reconnect and may have missed messages, the
+stream sends a fresh snapshot instead. Comment lines keep idle connections
+from being closed by proxies. A stream ends when the token that opened it
+expires, so an EventSource only keeps receiving while its token is valid.
+"""
+import json
+import threading
+import time
+from collections import deque
+
+from cache import ChannelSubscriber
+from availability import AVAILABILITY_CHANNEL, free_counts
+
+SSE_MIMETYPE = 'text/event-stream'
+HEARTBEAT_INTERVAL = 15  # Seconds between keep-alive comments on an idle stream
+EVENT_LOG_SIZE = 1024  # Changes kept for clients that are momentarily behind
+RETRY_MS = 3000  # Reconnect delay suggested to EventSource clients
+
+# Marker entry meaning "resend a snapshot"
+RESYNC = None
+
+
+class AvailabilityFeed:
+    """Per-process fan-out of the availability channel to any number of streams"""
+
+    def __init__(self, size=EVENT_LOG_SIZE):
+        self._condition = threading.Condition()
+        self._log = deque(maxlen=size)  # (seq, message) in arrival order
+        self._seq = 0
+        self.listeners = 0
+        # Whatever was published while unsubscribed is lost; have every stream resync
+        self._subscriber = ChannelSubscriber(AVAILABILITY_CHANNEL, 'availability-feed', self._on_message,
+                                             on_subscribe=lambda: self._append(RESYNC))
+
+    def _append(self, message):
+        with self._condition:
+            self._seq += 1
+            self._log.append((self._seq, message))
+            self._condition.notify_all()
+
+    def _on_message(self, data):
+        message = json.loads(data)
+        self._append(RESYNC if message.get('resync') else message)
+
+    def position(self):
+        """Sequence number of the latest message; pass it to follow() to receive everything after it"""
+        self._subscriber.ensure_running()
+        with self._condition:
+            return self._seq
+
+    def follow(self, seen, timeout=HEARTBEAT_INTERVAL):
+        """
+        Yield batches of messages published after position seen, RESYNC when the caller
+        must start over from a snapshot, or an empty batch after timeout seconds of silence.
+        """
+        with self._condition:
+            self.listeners += 1
+        try:
+            while True:
+                with self._condition:
+                    self._condition.wait_for(lambda: self._seq != seen, timeout)
+                    if self._seq == seen:
+                        batch = []
+                    elif not self._log or self._log[0][0] > seen + 1:
+                        batch = RESYNC  # Fell behind the log
+                    else:
+                        batch = [message for seq, message in self._log if seq > seen]
+                    seen = self._seq
+                if batch is not RESYNC and RESYNC in batch:
+                    batch = RESYNC
+                yield batch
+        finally:
+            with self._condition:
+                self.listeners -= 1
+
+
+availability_feed = AvailabilityFeed()
+
+
+def _event(name, data):
+    return f"event: {name}\ndata: {json.dumps(data)}\n\n"
+
+
+def _snapshot(app):
+    # A short app context of its own, so an open stream never holds a database session
+    with app.app_context():
+        counts = free_counts()
+    return _event('snapshot', {'lots': {str(lot_id): free for lot_id, free in counts.items()}})
+
+
+def availability_events(app, until=None):
+    """SSE body: a snapshot, then one 'availability' event per change message, until the epoch time until"""
+    yield f"retry: {RETRY_MS}\n\n"
+    # Position first, snapshot second: a change landing in between is sent again rather than lost,
+    # which is harmless because change events carry the new absolute count whenever it is known
+    seen = availability_feed.position()
+    yield _snapshot(app)
+    for batch in availability_feed.follow(seen):
+        if until is not None and time.time() >= until:
+            return
+        if batch is RESYNC:
+            yield _snapshot(app)
+        elif not batch:
+            yield ": keep-alive\n\n"
+        else:
+            yield ''.join(_event('availability', message) for message in batch)
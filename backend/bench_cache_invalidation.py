@@ -0,0 +1,123 @@
+"""
+Benchmark cache invalidation: KEYS pattern delete vs namespace version INCR.
+
+Fills Redis with a large keyspace of unrelated keys plus cached entries under
+the api:lots / api:spots namespaces, then times repeated invalidations both
+ways while a background client keeps issuing GETs, reporting how long each
+invalidation takes and how badly it stalls that other client.
+
+    python bench_cache_invalidation.py --keys 200000 --rounds 200
+
+Uses the Redis configured through REDIS_HOST / REDIS_PORT / REDIS_DB. Every
+key it writes lives under the "bench:" prefix and is removed afterwards.
+"""
+import argparse
+import sys
+import threading
+import time
+
+PREFIX = 'bench'
+NAMESPACES = ('api:lots', 'api:spots')
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--keys', type=int, default=200000, help='unrelated keys in the keyspace')
+    parser.add_argument('--entries', type=int, default=50, help='cached entries per namespace between invalidations')
+    parser.add_argument('--rounds', type=int, default=200, help='invalidations per strategy')
+    return parser.parse_args()
+
+
+def percentile(samples, fraction):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))] * 1000 if samples else 0
+
+
+def main():
+    args = parse_args()
+    from cache import redis_client
+
+    def fill(keys):
+        pipe = redis_client.pipeline(transaction=False)
+        for i, key in enumerate(keys, 1):
+            pipe.set(key, '{"cached": true}', ex=600)
+            if i % 10000 == 0:
+                pipe.execute()
+        pipe.execute()
+
+    def cleanup():
+        batch = []
+        for key in redis_client.scan_iter(match=f'{PREFIX}:*', count=10000):
+            batch.append(key)
+            if len(batch) >= 10000:
+                redis_client.unlink(*batch)
+                batch = []
+        if batch:
+            redis_client.unlink(*batch)
+
+    def invalidate_keys():
+        # The previous cache_clear_pattern: KEYS walks the whole keyspace in one blocking call
+        for namespace in NAMESPACES:
+            keys = redis_client.keys(f'{PREFIX}:{namespace}*')
+            if keys:
+                redis_client.delete(*keys)
+
+    def invalidate_version():
+        # cache_invalidate: one INCR per namespace, old entries are left to expire
+        pipe = redis_client.pipeline(transaction=False)
+        for namespace in NAMESPACES:
+            pipe.incr(f'{PREFIX}:cache:version:{namespace}')
+        pipe.execute()
+
+    def versioned_entries():
+        keys = []
+        for namespace in NAMESPACES:
+            version = int(redis_client.get(f'{PREFIX}:cache:version:{namespace}') or 0)
+            keys += [f'{PREFIX}:{namespace}:v{version}:{i}' for i in range(args.entries)]
+        return keys
+
+    def plain_entries():
+        return [f'{PREFIX}:{namespace}:{i}' for namespace in NAMESPACES for i in range(args.entries)]
+
+    cleanup()
+    print(f"filling {args.keys} unrelated keys ...")
+    fill(f'{PREFIX}:filler:{i}' for i in range(args.keys))
+
+    results = []
+    try:
+        for name, invalidate, entries in (('KEYS + DEL', invalidate_keys, plain_entries),
+                                          ('version INCR', invalidate_version, versioned_entries)):
+            stop = threading.Event()
+            reader_latencies = []
+
+            def reader():
+                # Another client reading a hot key while invalidations run
+                while not stop.is_set():
+                    began = time.perf_counter()
+                    redis_client.get(f'{PREFIX}:filler:0')
+                    reader_latencies.append(time.perf_counter() - began)
+
+            thread = threading.Thread(target=reader)
+            thread.start()
+            timings = []
+            for _ in range(args.rounds):
+                fill(entries())
+                began = time.perf_counter()
+                invalidate()
+                timings.append(time.perf_counter() - began)
+            stop.set()
+            thread.join()
+            results.append((name, timings, reader_latencies))
+    finally:
+        cleanup()
+
+    print(f"\n{'strategy':<14} {'invalidate p50':>15} {'p99':>9} {'reader GET p50':>15} {'p99':>9} {'max':>9}")
+    for name, timings, reader_latencies in results:
+        print(f"{name:<14} {percentile(timings, 0.5):13.2f}ms {percentile(timings, 0.99):7.2f}ms "
+              f"{percentile(reader_latencies, 0.5):13.2f}ms {percentile(reader_latencies, 0.99):7.2f}ms "
+              f"{max(reader_latencies) * 1000 if reader_latencies else 0:7.2f}ms")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
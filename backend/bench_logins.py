@@ -0,0 +1,142 @@
+"""
+Concurrent login benchmark for the bcrypt worker pool.
+
+Creates a scratch database with one user per login, then fires concurrent
+POST /auth/login calls and reports logins per second, latency, how many
+were turned away with 503 by the pool's backpressure, and how slow a cheap
+authenticated request got while the burst was running. Users can be stored
+at an older bcrypt cost to watch the hashes get upgraded on login.
+
+    python bench_logins.py --threads 32 --logins 200 --rounds 12
+    python bench_logins.py --workers 0                  # hash on the request thread, as before
+    python bench_logins.py --legacy-rounds 10 --rounds 12
+    DATABASE_URL=postgresql://... python bench_logins.py --keep-db
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--threads', type=int, default=32, help='concurrent client threads')
+    parser.add_argument('--logins', type=int, default=200, help='total login attempts')
+    parser.add_argument('--rounds', type=int, default=12, help='BCRYPT_ROUNDS for the run')
+    parser.add_argument('--legacy-rounds', type=int, default=0, help='store the users\' hashes at this cost instead')
+    parser.add_argument('--workers', type=int, default=None, help='BCRYPT_WORKERS (default: the configured value)')
+    parser.add_argument('--max-pending', type=int, default=None, help='BCRYPT_MAX_PENDING (default: the configured value)')
+    parser.add_argument('--keep-db', action='store_true', help='use DATABASE_URL as-is instead of a scratch SQLite file')
+    return parser.parse_args()
+
+
+def percentile(values, share):
+    return values[min(len(values) - 1, int(len(values) * share))] * 1000 if values else 0
+
+
+def main():
+    args = parse_args()
+    if not args.keep_db:
+        scratch = os.path.join(tempfile.mkdtemp(prefix='parkindia-bench-'), 'bench.db')
+        os.environ['DATABASE_URL'] = f'sqlite:///{scratch}'
+    os.environ['BCRYPT_ROUNDS'] = str(args.rounds)
+    if args.workers is not None:
+        os.environ['BCRYPT_WORKERS'] = str(args.workers)
+    if args.max_pending is not None:
+        os.environ['BCRYPT_MAX_PENDING'] = str(args.max_pending)
+
+    # Import after the environment is settled because Config reads it at import time
+    import bcrypt
+    from app import app
+    from flask_migrate import upgrade
+    from auth import generate_token
+    from models import db, User
+    from password_hashing import password_hasher
+
+    app.logger.setLevel(logging.CRITICAL)
+
+    with app.app_context():
+        upgrade()
+        # One shared precomputed hash keeps user creation out of the measured path
+        stored = bcrypt.hashpw(b'bench', bcrypt.gensalt(args.legacy_rounds or args.rounds)).decode('utf-8')
+        db.session.bulk_insert_mappings(User, [
+            {'username': f'bench{i}', 'email': f'bench{i}@example.com', 'password': stored, 'role': 'user'}
+            for i in range(args.logins)
+        ])
+        db.session.commit()
+        probe_token = generate_token(1, 'bench0', 'user')
+
+    outcomes = {'ok': 0, 'busy': 0, 'error': 0}
+    latencies = []
+    lock = threading.Lock()
+    queue = iter(range(args.logins))
+    start_barrier = threading.Barrier(args.threads + 1)
+    done = threading.Event()
+    probe_latencies = []
+
+    def worker():
+        client = app.test_client()
+        start_barrier.wait()
+        while True:
+            with lock:
+                i = next(queue, None)
+            if i is None:
+                return
+            began = time.perf_counter()
+            response = client.post('/auth/login', json={'username': f'bench{i}', 'password': 'bench'})
+            elapsed = time.perf_counter() - began
+            with lock:
+                latencies.append(elapsed)
+                if response.status_code == 200:
+                    outcomes['ok'] += 1
+                elif response.status_code == 503:
+                    outcomes['busy'] += 1
+                else:
+                    outcomes['error'] += 1
+
+    def probe():
+        # Stands in for the reservation traffic that shares the workers with the login burst
+        client = app.test_client()
+        start_barrier.wait()
+        while not done.is_set():
+            began = time.perf_counter()
+            client.get('/api/user/reservations', headers={'Authorization': f'Bearer {probe_token}'})
+            probe_latencies.append(time.perf_counter() - began)
+            time.sleep(0.05)
+
+    threads = [threading.Thread(target=worker) for _ in range(args.threads)]
+    prober = threading.Thread(target=probe)
+    prober.start()
+    began = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - began
+    done.set()
+    prober.join()
+
+    with app.app_context():
+        upgraded = sum(1 for (password,) in User.query.with_entities(User.password)
+                       .filter(User.username.like('bench%')) if password != stored)
+
+    latencies.sort()
+    probe_latencies.sort()
+    workers = password_hasher.workers or 'inline'
+    print(f"threads={args.threads} logins={args.logins} rounds={args.rounds} "
+          f"workers={workers} max_pending={password_hasher.max_pending}")
+    print(f"wall time: {wall:.2f}s  throughput: {outcomes['ok'] / wall:.1f} logins/s")
+    print(f"login latency p50={percentile(latencies, 0.5):.0f}ms p99={percentile(latencies, 0.99):.0f}ms")
+    print(f"other requests during the burst p50={percentile(probe_latencies, 0.5):.1f}ms "
+          f"p99={percentile(probe_latencies, 0.99):.1f}ms ({len(probe_latencies)} sampled)")
+    print(f"outcomes: {outcomes}")
+    if args.legacy_rounds:
+        print(f"hashes upgraded from cost {args.legacy_rounds} to {args.rounds}: {upgraded}/{args.logins}")
+    return 1 if outcomes['error'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
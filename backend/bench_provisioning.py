@@ -0,0 +1,81 @@
+"""
+Benchmark lot provisioning time against spot count.
+
+Times POST /api/admin/lots (batched spot inserts) and a shrink via
+PUT /api/admin/lots/<id> for increasing lot sizes on a scratch SQLite
+database, alongside the previous one-ORM-object-per-spot approach.
+
+    python bench_provisioning.py --sizes 100 1000 5000 20000
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 5000, 20000], help='spot counts to provision')
+    parser.add_argument('--skip-legacy', action='store_true', help='do not time the per-object reference implementation')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    scratch = os.path.join(tempfile.mkdtemp(prefix='parkindia-bench-'), 'bench.db')
+    os.environ['DATABASE_URL'] = f'sqlite:///{scratch}'
+
+    # Import after DATABASE_URL is settled because Config reads it at import time
+    from app import app
+    from flask_migrate import upgrade
+    from auth import generate_token
+    from models import db, ParkingLot, ParkingSpot
+
+    app.logger.setLevel(logging.CRITICAL)
+
+    with app.app_context():
+        upgrade()
+        headers = {'Authorization': f"Bearer {generate_token(1, 'bench-admin', 'admin')}"}
+
+    def legacy_create(spots):
+        # Reference: the per-object loop create_lot used before batched inserts
+        lot = ParkingLot(prime_location_name='Legacy', address='Bench Street', pin_code='000000',
+                         price_per_hour=10.0, number_of_spots=spots, available_spots=spots, occupied_spots=0)
+        db.session.add(lot)
+        db.session.commit()
+        for i in range(1, spots + 1):
+            db.session.add(ParkingSpot(lot_id=lot.id, spot_number=f"A{i}", status='A'))
+        db.session.commit()
+
+    client = app.test_client()
+    print(f"{'spots':>8} {'create (ms)':>12} {'shrink 50% (ms)':>16} {'legacy create (ms)':>19}")
+    for spots in args.sizes:
+        payload = {'prime_location_name': f'Bench {spots}', 'address': 'Bench Street', 'pin_code': '000000',
+                   'price_per_hour': 10.0, 'number_of_spots': spots}
+
+        began = time.perf_counter()
+        response = client.post('/api/admin/lots', json=payload, headers=headers)
+        create_ms = (time.perf_counter() - began) * 1000
+        lot_id = response.get_json()['lot_id']
+
+        began = time.perf_counter()
+        client.put(f'/api/admin/lots/{lot_id}', json={'number_of_spots': spots // 2}, headers=headers)
+        shrink_ms = (time.perf_counter() - began) * 1000
+
+        legacy_ms = None
+        if not args.skip_legacy:
+            with app.app_context():
+                began = time.perf_counter()
+                legacy_create(spots)
+                legacy_ms = (time.perf_counter() - began) * 1000
+
+        legacy = f"{legacy_ms:19.1f}" if legacy_ms is not None else f"{'-':>19}"
+        print(f"{spots:8d} {create_ms:12.1f} {shrink_ms:16.1f} {legacy}")
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
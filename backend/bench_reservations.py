@@ -0,0 +1,145 @@
+"""
+Multi-threaded stress harness for the reservation path.
+
+Creates a scratch database with one lot and one user per reservation, then
+fires concurrent POST /api/reserve calls at that single lot and reports
+throughput, conflict/retry counts and whether any spot was double-booked.
+
+    python bench_reservations.py --threads 64 --reservations 1000 --spots 1000
+    python bench_reservations.py --batch 25   # fleet path via /api/reserve/batch
+    DATABASE_URL=postgresql://... python bench_reservations.py --keep-db
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--threads', type=int, default=32, help='concurrent client threads')
+    parser.add_argument('--reservations', type=int, default=500, help='total reservation attempts')
+    parser.add_argument('--spots', type=int, default=500, help='spots in the contended lot')
+    parser.add_argument('--batch', type=int, default=0, help='reserve N spots per /api/reserve/batch call instead of one per /api/reserve')
+    parser.add_argument('--keep-db', action='store_true', help='use DATABASE_URL as-is instead of a scratch SQLite file')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if not args.keep_db:
+        scratch = os.path.join(tempfile.mkdtemp(prefix='parkindia-bench-'), 'bench.db')
+        os.environ['DATABASE_URL'] = f'sqlite:///{scratch}'
+
+    # Import after DATABASE_URL is settled because Config reads it at import time
+    from app import app
+    from flask_migrate import upgrade
+    from auth import generate_token
+    from allocator import spot_allocator
+    from models import db, User, ParkingLot, ParkingSpot, Reservation
+    from reservations import claim_stats, reset_claim_stats
+
+    app.logger.setLevel(logging.CRITICAL)  # Cache misses against a missing Redis are expected here
+
+    with app.app_context():
+        upgrade()
+        lot = ParkingLot(prime_location_name='Stress Test Garage', address='Bench Street', pin_code='000000',
+                         price_per_hour=10.0, number_of_spots=args.spots,
+                         available_spots=args.spots, occupied_spots=0)
+        db.session.add(lot)
+        db.session.flush()
+        db.session.bulk_insert_mappings(ParkingSpot, [
+            {'lot_id': lot.id, 'spot_number': f'A{i}', 'status': 'A'} for i in range(1, args.spots + 1)
+        ])
+        # One shared precomputed hash keeps user creation out of bcrypt
+        password = User(username='bench-template', email='bench@example.com')
+        password.set_password('bench')
+        db.session.bulk_insert_mappings(User, [
+            {'username': f'bench{i}', 'email': f'bench{i}@example.com', 'password': password.password, 'role': 'user',
+             'fleet': bool(args.batch)}
+            for i in range(-(-args.reservations // args.batch) if args.batch else args.reservations)
+        ])
+        db.session.commit()
+        lot_id = lot.id
+        tokens = [generate_token(user_id, username, 'user') for user_id, username in
+                  User.query.with_entities(User.id, User.username).filter(User.username.like('bench%')).all()]
+        spot_allocator.rebuild()
+
+    reset_claim_stats()
+    outcomes = {'ok': 0, 'full': 0, 'error': 0}
+    latencies = []
+    lock = threading.Lock()
+    queue = iter(tokens)
+    start_barrier = threading.Barrier(args.threads)
+
+    def worker():
+        client = app.test_client()
+        start_barrier.wait()
+        while True:
+            with lock:
+                token = next(queue, None)
+            if token is None:
+                return
+            began = time.perf_counter()
+            if args.batch:
+                response = client.post('/api/reserve/batch', json={'items': [{'lot_id': lot_id}] * args.batch},
+                                       headers={'Authorization': f'Bearer {token}'})
+            else:
+                response = client.post('/api/reserve', json={'lot_id': lot_id},
+                                       headers={'Authorization': f'Bearer {token}'})
+            elapsed = time.perf_counter() - began
+            body = response.get_json(silent=True) or {}
+            with lock:
+                latencies.append(elapsed)
+                if args.batch and response.status_code in (201, 400) and 'results' in body:
+                    outcomes['ok'] += body['reserved']
+                    outcomes['full'] += body['failed']
+                elif response.status_code == 201:
+                    outcomes['ok'] += 1
+                elif response.status_code == 400:
+                    outcomes['full'] += 1
+                else:
+                    outcomes['error'] += 1
+
+    threads = [threading.Thread(target=worker) for _ in range(args.threads)]
+    began = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - began
+
+    with app.app_context():
+        active = Reservation.query.filter(Reservation.leaving_timestamp.is_(None)).count()
+        distinct_spots = db.session.query(Reservation.spot_id).filter(
+            Reservation.leaving_timestamp.is_(None)).distinct().count()
+        occupied = ParkingSpot.query.filter_by(lot_id=lot_id, status='O').count()
+        lot = db.session.get(ParkingLot, lot_id)
+        counters = (lot.available_spots, lot.occupied_spots)
+
+    stats = claim_stats()
+    attempts = stats['claims'] + stats['conflicts'] + stats['exhausted']
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2] * 1000 if latencies else 0
+    p99 = latencies[int(len(latencies) * 0.99) - 1] * 1000 if latencies else 0
+
+    print(f"threads={args.threads} attempts={args.reservations} spots={args.spots} batch={args.batch or 'off'}")
+    print(f"wall time: {wall:.2f}s  throughput: {outcomes['ok'] / wall:.1f} reservations/s")
+    print(f"latency p50={p50:.1f}ms p99={p99:.1f}ms")
+    print(f"outcomes: {outcomes}")
+    print(f"claims={stats['claims']} conflicts={stats['conflicts']} retries={stats['retries']} "
+          f"exhausted={stats['exhausted']} conflict rate={stats['conflicts'] / attempts if attempts else 0:.2%}")
+    print(f"active reservations={active} distinct spots={distinct_spots} occupied rows={occupied} "
+          f"lot counters (available, occupied)={counters}")
+
+    double_booked = active != distinct_spots or active != occupied or counters[1] != occupied
+    if double_booked:
+        print("FAIL: reservations and spot state disagree")
+    return 1 if double_booked or outcomes['error'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,117 @@
+"""
+Micro-benchmark for serializing reservation listings.
+
+Loads a scratch database with --reservations rows, then times turning all of
+them into a JSON body three ways:
+
+  orm         Reservation objects (spot joined-loaded) and a dict per object
+  rows        RESERVATION_COLUMNS tuples through serializers.serialize_reservations
+  rows+orjson the same rows encoded with orjson instead of the stdlib json
+
+    python bench_serializers.py --reservations 100000
+    DATABASE_URL=postgresql://... python bench_serializers.py --keep-db
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--reservations', type=int, default=100000, help='reservations to serialize')
+    parser.add_argument('--rounds', type=int, default=3, help='timed runs per strategy (best is reported)')
+    parser.add_argument('--keep-db', action='store_true', help='use DATABASE_URL as-is instead of a scratch SQLite file')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if not args.keep_db:
+        scratch = os.path.join(tempfile.mkdtemp(prefix='parkindia-bench-'), 'bench.db')
+        os.environ['DATABASE_URL'] = f'sqlite:///{scratch}'
+
+    # Import after DATABASE_URL is settled because Config reads it at import time
+    from app import app
+    from flask_migrate import upgrade
+    from sqlalchemy.orm import joinedload
+    from models import db, User, ParkingLot, ParkingSpot, Reservation
+    from serializers import RESERVATION_COLUMNS, serialize_reservations, orjson
+
+    app.logger.setLevel(logging.CRITICAL)
+
+    with app.app_context():
+        upgrade()
+        lot = ParkingLot(prime_location_name='Bench Garage', address='Bench Street', pin_code='000000',
+                         price_per_hour=10.0, number_of_spots=1000, available_spots=1000, occupied_spots=0)
+        db.session.add(lot)
+        db.session.flush()
+        db.session.bulk_insert_mappings(ParkingSpot, [
+            {'lot_id': lot.id, 'spot_number': f'A{i}', 'status': 'A'} for i in range(1, 1001)])
+        user = User(username='bench-serializers', email='bench@example.com', password='x', role='user')
+        db.session.add(user)
+        db.session.flush()
+        spot_ids = [spot_id for (spot_id,) in ParkingSpot.query.with_entities(ParkingSpot.id)]
+        start = datetime.utcnow() - timedelta(hours=args.reservations + 1)
+        db.session.bulk_insert_mappings(Reservation, [
+            {'user_id': user.id, 'spot_id': spot_ids[i % len(spot_ids)],
+             'parking_timestamp': start + timedelta(hours=i),
+             'leaving_timestamp': start + timedelta(hours=i, minutes=50) if i % 10 else None,
+             'parking_cost': 10.0 if i % 10 else 0.0}
+            for i in range(args.reservations)])
+        db.session.commit()
+        user_id = user.id
+
+        def orm():
+            reservations = Reservation.query.options(joinedload(Reservation.spot)).filter_by(user_id=user_id).all()
+            items = [{
+                'id': reservation.id,
+                'spot_id': reservation.spot_id,
+                'lot_id': reservation.spot.lot_id if reservation.spot else None,
+                'parking_timestamp': reservation.parking_timestamp.isoformat() if reservation.parking_timestamp else None,
+                'leaving_timestamp': reservation.leaving_timestamp.isoformat() if reservation.leaving_timestamp else None,
+                'parking_cost': reservation.parking_cost,
+                'status': 'active' if not reservation.leaving_timestamp else 'completed'
+            } for reservation in reservations]
+            db.session.expunge_all()  # Each round starts from an empty identity map
+            return json.dumps(items)
+
+        def rows():
+            return db.session.query(*RESERVATION_COLUMNS) \
+                .join(ParkingSpot, ParkingSpot.id == Reservation.spot_id) \
+                .filter(Reservation.user_id == user_id).all()
+
+        strategies = [('orm', orm), ('rows', lambda: json.dumps(serialize_reservations(rows())))]
+        if orjson is not None:
+            strategies.append(('rows+orjson', lambda: orjson.dumps(serialize_reservations(rows()))))
+        else:
+            print("orjson is not installed; skipping rows+orjson")
+
+        # Serialization alone, on rows already fetched
+        fetched = rows()
+        print(f"{args.reservations} reservations\n")
+        print(f"{'strategy':<12} {'query+serialize':>16} {'serialize only':>15} {'body':>12}")
+        for name, run in strategies:
+            best = None
+            for _ in range(args.rounds):
+                began = time.perf_counter()
+                body = run()
+                elapsed = time.perf_counter() - began
+                best = elapsed if best is None else min(best, elapsed)
+            if name == 'orm':
+                only = '-'
+            else:
+                encode = orjson.dumps if name == 'rows+orjson' else json.dumps
+                began = time.perf_counter()
+                encode(serialize_reservations(fetched))
+                only = f"{(time.perf_counter() - began) * 1000:.0f}ms"
+            print(f"{name:<12} {best * 1000:14.0f}ms {only:>15} {len(body):>12,}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
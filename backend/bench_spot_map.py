@@ -0,0 +1,88 @@
+"""
+Benchmark the compact spot map against the per-spot JSON listing.
+
+Builds synthetic garages (spot rows shaped like the /api/spots join, with a
+random share of occupied spots) and times encoding each one both ways,
+reporting body size raw and gzip-compressed:
+
+    python bench_spot_map.py --lots 20 --spots 10000 --occupied 0.3
+
+Needs no database or Redis; only the encoders are measured.
+"""
+import argparse
+import gzip
+import json
+import random
+import time
+from collections import namedtuple
+
+Row = namedtuple('Row', 'id lot_id spot_number status prime_location_name address')
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--lots', type=int, default=20, help='lots in the listing')
+    parser.add_argument('--spots', type=int, default=10000, help='spots per lot')
+    parser.add_argument('--occupied', type=float, default=0.3, help='share of occupied spots')
+    parser.add_argument('--rounds', type=int, default=5, help='timed encodings per format (best is reported)')
+    return parser.parse_args()
+
+
+class RowQuery:
+    # Stands in for the SQLAlchemy query encode_lots() reads with yield_per
+    def __init__(self, rows):
+        self.rows = rows
+
+    def yield_per(self, size):
+        return iter(self.rows)
+
+
+def best_of(rounds, fn):
+    best, result = None, None
+    for _ in range(rounds):
+        began = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - began
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    args = parse_args()
+    from spot_map import encode_lots, decode_spots
+
+    rng = random.Random(42)
+    rows = []
+    for lot_id in range(1, args.lots + 1):
+        name, address = f"Garage {lot_id}", f"{lot_id} Ring Road, Sector {lot_id % 9}, Bengaluru"
+        for number in range(1, args.spots + 1):
+            status = 'O' if rng.random() < args.occupied else 'A'
+            rows.append(Row(len(rows) + 1, lot_id, f"A{number}", status, name, address))
+
+    def per_spot():
+        # The regular /api/spots body
+        return json.dumps([{'id': row.id, 'lot_id': row.lot_id, 'spot_number': row.spot_number,
+                            'status': row.status, 'lot_name': row.prime_location_name,
+                            'lot_address': row.address} for row in rows]).encode()
+
+    def spot_map():
+        return json.dumps({'lots': encode_lots(RowQuery(rows))}, separators=(',', ':')).encode()
+
+    print(f"{len(rows)} spots in {args.lots} lots, {args.occupied:.0%} occupied\n")
+    print(f"{'format':<10} {'encode':>10} {'body':>12} {'gzip':>12} {'gzip time':>10}")
+    results = {}
+    for name, encode in (('per-spot', per_spot), ('spot map', spot_map)):
+        encode_time, body = best_of(args.rounds, encode)
+        gzip_time, compressed = best_of(args.rounds, lambda: gzip.compress(body, 5))
+        results[name] = body
+        print(f"{name:<10} {encode_time * 1000:8.1f}ms {len(body):>12,} {len(compressed):>12,} {gzip_time * 1000:8.1f}ms")
+
+    # The map must expand back to exactly the same spots
+    decoded = [spot for lot in json.loads(results['spot map'])['lots'] for spot in decode_spots(lot)]
+    expected = [{'id': row.id, 'spot_number': row.spot_number, 'status': row.status} for row in rows]
+    print(f"\nround trip {'ok' if decoded == expected else 'MISMATCH'}")
+    return 0 if decoded == expected else 1
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -1,75 +1,506 @@
 import redis
 import json
+import logging
+import math
 import os
+import random
+import threading
+import time
+import uuid
 from functools import wraps
-from flask import current_app
+from flask import current_app, g, has_request_context
+from config import Config
+from local_cache import LocalCache
 
-# Initialize Redis client connection
-redis_client = redis.Redis(
-    host=os.getenv('REDIS_HOST', 'localhost'),
-    port=int(os.getenv('REDIS_PORT', 6379)),
-    db=int(os.getenv('REDIS_DB', 0)),
+# Bounded pool shared by every thread in the process; when it is exhausted callers wait
+# up to REDIS_POOL_TIMEOUT for a connection instead of opening unbounded new ones
+redis_pool = redis.BlockingConnectionPool(
+    host=Config.REDIS_HOST,
+    port=Config.REDIS_PORT,
+    db=Config.REDIS_DB,
+    max_connections=Config.REDIS_MAX_CONNECTIONS,
+    timeout=Config.REDIS_POOL_TIMEOUT,
+    socket_timeout=Config.REDIS_SOCKET_TIMEOUT,
+    socket_connect_timeout=Config.REDIS_CONNECT_TIMEOUT,
+    socket_keepalive=True,
+    health_check_interval=Config.REDIS_HEALTH_CHECK_INTERVAL,
     decode_responses=True  # Automatically decode byte responses to strings
 )
 
+# Initialize Redis client connection
+redis_client = redis.Redis(connection_pool=redis_pool)
+
+# Optional in-process tier in front of Redis; LOCAL_CACHE_SIZE=0 (the default) turns it off
+local_cache = LocalCache(
+    maxsize=int(os.getenv('LOCAL_CACHE_SIZE', 0)),
+    ttl=float(os.getenv('LOCAL_CACHE_TTL', 5))
+)
+# Every process evicts its local tier when an invalidation is published here
+INVALIDATION_CHANNEL = "cache:invalidate"
+
+logger = logging.getLogger(__name__)
+_stats_lock = threading.Lock()
+_stats = {'local_hits': 0, 'local_misses': 0, 'redis_hits': 0, 'redis_misses': 0, 'redis_errors': 0,
+          'rebuilds': 0, 'early_refreshes': 0, 'stale_served': 0, 'lock_waits': 0}
+# Message field -> callbacks run in every process when another worker publishes that field
+_invalidation_hooks = {}
+
+class ChannelSubscriber:
+    """
+    One daemon thread per process subscribed to a pub/sub channel, started on first use
+    (and again in a forked child) and reconnecting with exponential backoff.
+
+    on_message(data) runs for every message, on_subscribe() after each (re)subscribe
+    and on_disconnect() when the subscription drops; messages published in between
+    are lost, so the callbacks must resynchronise whatever they feed. down is True
+    from a dropped subscription until the next one (not while first connecting).
+    origin is a per-process id a publisher can attach to recognise its own messages.
+    """
+
+    def __init__(self, channel, name, on_message, on_subscribe=None, on_disconnect=None):
+        self.channel = channel
+        self.name = name
+        self._on_message = on_message
+        self._on_subscribe = on_subscribe
+        self._on_disconnect = on_disconnect
+        self._lock = threading.Lock()
+        self._pid = None
+        self.origin = None
+        self.ready = threading.Event()
+        self.down = False
+
+    def ensure_running(self):
+        """Start the subscriber in this process if needed; True once it is subscribed"""
+        if self._pid != os.getpid():
+            with self._lock:
+                # Checked again under the lock so concurrent first callers start a single thread
+                if self._pid != os.getpid():
+                    self.ready = threading.Event()
+                    self.down = False
+                    self.origin = uuid.uuid4().hex
+                    self._pid = os.getpid()
+                    threading.Thread(target=self._run, name=self.name, daemon=True).start()
+        return self.ready.is_set()
+
+    def _run(self):
+        delay = 1
+        while True:
+            pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+            try:
+                pubsub.subscribe(self.channel)
+                if self._on_subscribe:
+                    self._on_subscribe()
+                self.down = False
+                self.ready.set()
+                delay = 1
+                while True:
+                    # Poll rather than listen() so the pool's socket timeout does not drop an idle subscription
+                    message = pubsub.get_message(timeout=1.0)
+                    if message is not None:
+                        self._on_message(message['data'])
+            except Exception as e:
+                self.ready.clear()
+                self.down = True
+                if self._on_disconnect:
+                    self._on_disconnect()
+                logger.warning(f"{self.name} listener reconnecting in {delay}s: {e}")
+                try:
+                    pubsub.close()  # Hand the connection back to the bounded pool
+                except Exception:
+                    pass
+                time.sleep(delay)
+                delay = min(delay * 2, 30)
+
+def _record(name):
+    with _stats_lock:
+        _stats[name] += 1
+
+def cache_stats():
+    """Hit and miss counts for the local and Redis tiers of this process"""
+    with _stats_lock:
+        stats = dict(_stats)
+    return {
+        'local': {
+            'enabled': bool(local_cache.maxsize),
+            'listening': invalidation_subscriber.ready.is_set(),
+            'hits': stats['local_hits'],
+            'misses': stats['local_misses'],
+            'size': len(local_cache),
+            'max_size': local_cache.maxsize,
+            'evictions': local_cache.evictions
+        },
+        'redis': {
+            'hits': stats['redis_hits'],
+            'misses': stats['redis_misses'],
+            'errors': stats['redis_errors']
+        },
+        'recompute': {
+            'rebuilds': stats['rebuilds'],
+            'early_refreshes': stats['early_refreshes'],
+            'stale_served': stats['stale_served'],
+            'lock_waits': stats['lock_waits']
+        }
+    }
+
+def _apply_invalidation(message):
+    # Mirror of what the publishing process already did to its own local tier
+    for namespace in message.get('namespaces', ()):
+        local_cache.delete(f"{NAMESPACE_VERSION_PREFIX}:{namespace}")
+        local_cache.delete_prefix(f"{namespace}:v")
+    if message.get('keys'):
+        local_cache.delete(*message['keys'])
+    if message.get('pattern'):
+        local_cache.delete_matching(message['pattern'])
+
+def register_invalidation_hook(field, callback):
+    """
+    Run callback(message[field]) in every process whenever another worker publishes a
+    message carrying field, and callback(None) after each (re)subscribe, when messages
+    may have been missed.
+    """
+    _invalidation_hooks.setdefault(field, []).append(callback)
+
+def _run_hooks(message=None):
+    for field, callbacks in _invalidation_hooks.items():
+        if message is not None and field not in message:
+            continue
+        for callback in callbacks:
+            try:
+                callback(None if message is None else message[field])
+            except Exception as e:
+                logger.warning(f"Invalidation hook for {field} failed: {e}")
+
+def _on_invalidation(data):
+    message = json.loads(data)
+    if message.get('origin') != invalidation_subscriber.origin:
+        _apply_invalidation(message)
+        _run_hooks(message)
+
+def _on_resubscribe():
+    # Anything cached while unsubscribed may have missed an invalidation
+    local_cache.clear()
+    _run_hooks()
+
+# Keeps this process's local tier and invalidation hooks in step with every other worker
+invalidation_subscriber = ChannelSubscriber(INVALIDATION_CHANNEL, 'cache-invalidation', _on_invalidation,
+                                            on_subscribe=_on_resubscribe, on_disconnect=local_cache.clear)
+
+def ensure_invalidation_listener():
+    """Start this process's invalidation subscriber if needed; True once it is live"""
+    return invalidation_subscriber.ensure_running()
+
+def _local_enabled():
+    """True when the local tier is configured and its invalidation subscription is live"""
+    return bool(local_cache.maxsize) and ensure_invalidation_listener()
+
+def publish_change(**message):
+    """Announce a change to the invalidation hooks of every other worker (see register_invalidation_hook)"""
+    ensure_invalidation_listener()
+    redis_client.publish(INVALIDATION_CHANNEL, json.dumps({'origin': invalidation_subscriber.origin, **message}))
+
+def _publish_invalidation(**message):
+    # Evict locally right away (which also fences off in-flight fills), then tell the other workers
+    _apply_invalidation(message)
+    redis_client.publish(INVALIDATION_CHANNEL, json.dumps({'origin': invalidation_subscriber.origin, **message}))
+
 def cache_key(prefix, *args):
     """Generate a cache key string from prefix and arguments"""
     return f"{prefix}:{':'.join(str(arg) for arg in args)}"
 
+# Version counters for invalidatable namespaces, e.g. cache:version:api:lots
+NAMESPACE_VERSION_PREFIX = "cache:version"
+
+def namespace_versions(*namespaces, strict=False):
+    """
+    Current versions of several cache namespaces (0 until first invalidated), read with one MGET.
+
+    If Redis is unreachable the versions read as 0, or with strict=True the error is raised.
+    """
+    version_keys = [f"{NAMESPACE_VERSION_PREFIX}:{namespace}" for namespace in namespaces]
+    versions = {}
+    use_local = _local_enabled()
+    if use_local:
+        generation = local_cache.generation
+        for namespace, version_key in zip(namespaces, version_keys):
+            version = local_cache.get(version_key)
+            if version is not None:
+                versions[namespace] = version
+    missing = [(namespace, version_key) for namespace, version_key in zip(namespaces, version_keys)
+               if namespace not in versions]
+    if not missing:
+        return versions
+
+    try:
+        values = redis_client.mget([version_key for _, version_key in missing])
+    except Exception as e:
+        if strict:
+            raise
+        current_app.logger.error(f"Cache version error: {e}")
+        values = [None] * len(missing)
+    else:
+        if use_local:
+            for (_, version_key), value in zip(missing, values):
+                local_cache.set(version_key, int(value or 0), generation=generation)
+    for (namespace, _), value in zip(missing, values):
+        versions[namespace] = int(value or 0)
+    return versions
+
+def namespace_version(namespace):
+    """Current version of a cache namespace (0 until it is first invalidated)"""
+    return namespace_versions(namespace)[namespace]
+
+def versioned_key(namespace, *args, version=None):
+    """Cache key inside a namespace's current version, e.g. api:lots:v7 or api:spots:v3:1:A"""
+    key = f"{namespace}:v{namespace_version(namespace) if version is None else version}"
+    return f"{key}:{':'.join(str(arg) for arg in args)}" if args else key
+
+def cache_invalidate(*namespaces):
+    """Invalidate whole namespaces with one INCR each; entries under old versions simply expire"""
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        for namespace in namespaces:
+            pipe.incr(f"{NAMESPACE_VERSION_PREFIX}:{namespace}")
+        pipe.execute()
+        if local_cache.maxsize:
+            _publish_invalidation(namespaces=list(namespaces))
+        return True
+    except Exception as e:
+        current_app.logger.error(f"Cache invalidate error: {e}")
+        return False
+
 def cache_get(key):
-    """Retrieve value from Redis cache by key"""
+    """Retrieve value from the local tier, falling back to Redis (the returned value must not be mutated)"""
+    use_local = _local_enabled()
+    if use_local:
+        value = local_cache.get(key)
+        if value is not None:
+            _record('local_hits')
+            return value
+        _record('local_misses')
+        generation = local_cache.generation
+
     try:
-        value = redis_client.get(key)
-        return json.loads(value) if value else None
+        raw = redis_client.get(key)
     except Exception as e:
+        _record('redis_errors')
         current_app.logger.error(f"Cache get error: {e}")
         return None
+    if not raw:
+        _record('redis_misses')
+        return None
+
+    _record('redis_hits')
+    value = json.loads(raw)
+    if use_local:
+        local_cache.set(key, value, generation=generation)
+    return value
 
 def cache_set(key, value, expire=300):
-    """Store value in Redis cache with expiration time (default 5 minutes)"""
+    """Store value in Redis (and the local tier) with expiration time (default 5 minutes)"""
     try:
         redis_client.setex(key, expire, json.dumps(value))
+        if _local_enabled():
+            local_cache.set(key, value, ttl=expire)
         return True
     except Exception as e:
         current_app.logger.error(f"Cache set error: {e}")
         return False
 
+def cache_get_many(keys):
+    """Values for several keys in order (None where missing), with one MGET for everything not held locally"""
+    keys = list(keys)
+    values = [None] * len(keys)
+    use_local = _local_enabled()
+    if use_local:
+        generation = local_cache.generation
+        for i, key in enumerate(keys):
+            values[i] = local_cache.get(key)
+            _record('local_hits' if values[i] is not None else 'local_misses')
+    missing = [i for i, value in enumerate(values) if value is None]
+    if not missing:
+        return values
+
+    try:
+        raw_values = redis_client.mget([keys[i] for i in missing])
+    except Exception as e:
+        _record('redis_errors')
+        current_app.logger.error(f"Cache get many error: {e}")
+        return values
+    for i, raw in zip(missing, raw_values):
+        if not raw:
+            _record('redis_misses')
+            continue
+        _record('redis_hits')
+        values[i] = json.loads(raw)
+        if use_local:
+            local_cache.set(keys[i], values[i], generation=generation)
+    return values
+
+def cache_set_many(mapping, expire=300):
+    """Store several key/value pairs with one pipelined round trip"""
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        for key, value in mapping.items():
+            pipe.setex(key, expire, json.dumps(value))
+        pipe.execute()
+        if _local_enabled():
+            for key, value in mapping.items():
+                local_cache.set(key, value, ttl=expire)
+        return True
+    except Exception as e:
+        current_app.logger.error(f"Cache set many error: {e}")
+        return False
+
 def cache_delete(key):
     """Remove a specific key from Redis cache"""
     try:
         redis_client.delete(key)
+        if local_cache.maxsize:
+            _publish_invalidation(keys=[key])
         return True
     except Exception as e:
         current_app.logger.error(f"Cache delete error: {e}")
         return False
 
 def cache_clear_pattern(pattern):
-    """Delete all cache keys matching a given pattern (e.g., "api:lots*")"""
+    """Delete all cache keys matching a given pattern (e.g., "api:lots*"); prefer cache_invalidate on hot paths"""
     try:
-        keys = redis_client.keys(pattern)
-        if keys:
-            redis_client.delete(*keys)
+        # SCAN walks the keyspace incrementally instead of blocking Redis like KEYS
+        batch = []
+        for key in redis_client.scan_iter(match=pattern, count=1000):
+            batch.append(key)
+            if len(batch) >= 1000:
+                redis_client.unlink(*batch)
+                batch = []
+        if batch:
+            redis_client.unlink(*batch)
+        if local_cache.maxsize:
+            _publish_invalidation(pattern=pattern)
         return True
     except Exception as e:
         current_app.logger.error(f"Cache clear pattern error: {e}")
         return False
 
-def cached(expire=300, key_prefix="default"):
-    """Decorator to automatically cache function results in Redis"""
+# Single-flight recomputation: how long a rebuild lock is held at most, and how long others wait on it
+REBUILD_LOCK_TTL = 5
+REBUILD_WAIT = 0.5
+REBUILD_POLL_INTERVAL = 0.025
+STALE_EXPIRE = 300
+
+def _release_lock(lock_key, token):
+    try:
+        if redis_client.get(lock_key) == token:
+            redis_client.delete(lock_key)
+    except Exception as e:
+        current_app.logger.error(f"Cache unlock error: {e}")
+
+def _rebuild(key, compute, expire, stale_key, tags):
+    # Recompute a value, timing it so readers can refresh early in proportion to the cost
+    began = time.monotonic()
+    value = compute()
+    delta = time.monotonic() - began
+    _record('rebuilds')
+    envelope = {'value': value, 'delta': delta, 'expires': time.time() + expire}
+    if tags:
+        # Versions are read after computing, so a write that lands mid-build can go unnoticed until expiry
+        envelope['tags'] = namespace_versions(*tags(value))
+    cache_set(key, envelope, expire)
+    if stale_key:
+        cache_set(stale_key, value, STALE_EXPIRE)
+    return value
+
+def _tags_current(envelope):
+    # An entry tagged with namespaces is only valid while none of them has been invalidated since
+    tags = envelope.get('tags')
+    return not tags or namespace_versions(*tags) == tags
+
+def cache_fetch(key, compute, expire=300, stale_key=None, beta=1.0, tags=None):
+    """
+    Return the cached value for key, recomputing it at most once across all workers.
+
+    On a miss one caller takes a short Redis lock and runs compute(); the others
+    serve the last value kept under stale_key, or wait up to REBUILD_WAIT for the
+    rebuild before computing themselves. Hits refresh early with probability
+    rising towards expiry (XFetch, scaled by beta and the measured compute time),
+    so hot keys are usually rebuilt before they ever miss.
+
+    tags(value) may name extra namespaces the value depends on (e.g. the lots
+    on a page of spots); invalidating any of them makes the entry a miss, and
+    its previous value is what other callers get while it is rebuilt.
+    """
+    previous = None
+    envelope = cache_get(key)
+    if isinstance(envelope, dict) and 'expires' in envelope:
+        if not _tags_current(envelope):
+            previous = envelope['value']
+        # XFetch: -log(random()) is an exponential draw, so early refreshes spread out ahead of expiry
+        elif time.time() - envelope['delta'] * beta * math.log(random.random() or 1e-12) < envelope['expires']:
+            return envelope['value']
+        else:
+            lock_key, token = f"lock:{key}", uuid.uuid4().hex
+            try:
+                acquired = redis_client.set(lock_key, token, nx=True, ex=REBUILD_LOCK_TTL)
+            except Exception:
+                acquired = False
+            if not acquired:
+                return envelope['value']  # Someone else is already refreshing it
+            _record('early_refreshes')
+            try:
+                return _rebuild(key, compute, expire, stale_key, tags)
+            finally:
+                _release_lock(lock_key, token)
+
+    lock_key, token = f"lock:{key}", uuid.uuid4().hex
+    try:
+        acquired = redis_client.set(lock_key, token, nx=True, ex=REBUILD_LOCK_TTL)
+    except Exception as e:
+        # Redis is unavailable: no coordination possible, just compute
+        current_app.logger.error(f"Cache lock error: {e}")
+        return compute()
+
+    if acquired:
+        try:
+            return _rebuild(key, compute, expire, stale_key, tags)
+        finally:
+            _release_lock(lock_key, token)
+
+    if previous is None and stale_key:
+        previous = cache_get(stale_key)
+    if previous is not None:
+        _record('stale_served')
+        if has_request_context():
+            g.cache_served_stale = True  # Tells conditional GETs not to tag this body with the new version
+        return previous
+
+    _record('lock_waits')
+    deadline = time.monotonic() + REBUILD_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(REBUILD_POLL_INTERVAL)
+        try:
+            raw = redis_client.get(key)
+        except Exception:
+            break
+        if raw:
+            envelope = json.loads(raw)
+            if isinstance(envelope, dict) and 'expires' in envelope:
+                return envelope['value']
+    # The rebuilding worker is slow or died holding the lock; do not keep the caller waiting
+    return compute()
+
+def cached(expire=300, key_prefix="default", namespace=None):
+    """
+    Decorator to cache function results in Redis with single-flight recomputation.
+
+    With namespace the key lives under that namespace's version, so
+    cache_invalidate(namespace) retires it.
+    """
     def decorator(func):
         @wraps(func)
         def wrapper(*args, **kwargs):
             # Generate unique cache key from function name and arguments
-            cache_key_name = cache_key(key_prefix, func.__name__, *args, *kwargs.values())
-            
-            # Check if result exists in cache
-            cached_result = cache_get(cache_key_name)
-            if cached_result is not None:
-                return cached_result
-            
-            # Execute function and cache the result
-            result = func(*args, **kwargs)
-            cache_set(cache_key_name, result, expire)
-            return result
+            parts = (func.__name__, *args, *kwargs.values())
+            cache_key_name = versioned_key(namespace, *parts) if namespace else cache_key(key_prefix, *parts)
+            stale_key = cache_key(namespace or key_prefix, "stale", *parts)
+            return cache_fetch(cache_key_name, lambda: func(*args, **kwargs), expire, stale_key)
         return wrapper
     return decorator
\ No newline at end of file
@@ -1,5 +1,5 @@
 # Simple import to use the celery instance from tasks.py
-from tasks import celery, generate_parking_report
+from tasks import celery, generate_parking_report, import_lots_task
 
 # This makes the celery instance available when importing celery_app
 # The worker command will use: celery -A celery_app worker --loglevel=info
@@ -0,0 +1,145 @@
+"""
+Query-plan check for the API routes.
+
+Builds a scratch database through the migrations, seeds the demo dataset,
+calls each route while recording the SQL it issues, then EXPLAINs every
+filtered statement. A full table scan behind a WHERE clause means a hot
+predicate has no usable index, and the script exits non-zero.
+
+    python check_query_plans.py
+    DATABASE_URL=postgresql://... python check_query_plans.py --keep-db
+
+On Postgres sequential scans are disabled for the EXPLAIN, so a "Seq Scan"
+in the plan means no index could serve the predicate at all.
+"""
+import argparse
+import logging
+import os
+import re
+import sys
+import tempfile
+
+# Routes exercised by the check: (method, path, json body, role of the caller)
+ROUTES = [
+    ('GET', '/api/lots', None, 'user'),
+    ('GET', '/api/spots', None, 'user'),
+    ('GET', '/api/search?q=parking', None, 'user'),
+    ('GET', '/api/user/dashboard', None, 'user'),
+    ('GET', '/user/dashboard', None, 'user'),
+    ('GET', '/api/user/profile', None, 'user'),
+    ('GET', '/api/user/reservations', None, 'user'),
+    ('POST', '/api/reserve', {'lot_id': 1}, 'user'),
+    ('POST', '/api/release', {'reservation_id': None}, 'user'),
+    ('GET', '/api/users', None, 'admin'),
+    ('GET', '/api/status', None, 'admin'),
+    ('GET', '/admin/dashboard', None, 'admin'),
+    ('GET', '/api/admin/lots', None, 'admin'),
+    ('GET', '/api/admin/lots/1', None, 'admin'),
+    ('GET', '/api/admin/lots/1/spots', None, 'admin'),
+    ('GET', '/api/admin/users', None, 'admin'),
+    ('GET', '/api/admin/search?q=user', None, 'admin'),
+]
+
+FILTERED = re.compile(r'\bWHERE\b', re.IGNORECASE)
+# Index-backed scans, FTS5 MATCH lookups (":M" constraint) and constant rows are not table scans
+SQLITE_SCAN = re.compile(r'\bSCAN (\w+)\b(?! USING (?:COVERING )?INDEX| VIRTUAL TABLE INDEX \d+:M| ROW\b)')
+POSTGRES_SCAN = re.compile(r'Seq Scan on (\w+)')
+# One-off schema probes (e.g. search.py detecting its index) are not hot-path queries
+CATALOG_TABLES = {'sqlite_master', 'pg_indexes', 'pg_index', 'pg_class'}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--keep-db', action='store_true', help='use DATABASE_URL as-is instead of a scratch SQLite file')
+    parser.add_argument('--verbose', action='store_true', help='print every plan, not just failures')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if not args.keep_db:
+        scratch = os.path.join(tempfile.mkdtemp(prefix='parkindia-plans-'), 'plans.db')
+        os.environ['DATABASE_URL'] = f'sqlite:///{scratch}'
+
+    # Import after DATABASE_URL is settled because Config reads it at import time
+    from sqlalchemy import event
+    from flask_migrate import upgrade
+    from app import app
+    from auth import generate_token
+    from demo_data import seed_demo_data
+    from models import db, User
+
+    app.logger.setLevel(logging.CRITICAL)
+    logging.getLogger('alembic').setLevel(logging.WARNING)
+
+    with app.app_context():
+        upgrade()
+        seed_demo_data(force_reset=True)
+        admin = User.query.filter_by(role='admin').first()
+        if not admin:
+            admin = User(username='admin', email='admin@test.com', role='admin', password='-')
+            db.session.add(admin)
+            db.session.commit()
+        user = User.query.filter_by(username='user3').first()
+        tokens = {
+            'admin': generate_token(admin.id, admin.username, admin.role),
+            'user': generate_token(user.id, user.username, user.role),
+        }
+        engine = db.engine
+        dialect = engine.dialect.name
+
+    captured = []
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().upper().startswith(('SELECT', 'UPDATE', 'DELETE')):
+            captured.append((statement, parameters))
+
+    def explain(statement, parameters):
+        raw = engine.raw_connection()
+        try:
+            cursor = raw.cursor()
+            if dialect == 'sqlite':
+                cursor.execute(f'EXPLAIN QUERY PLAN {statement}', parameters)
+                plan = '\n'.join(row[-1] for row in cursor.fetchall())
+                scans = SQLITE_SCAN.findall(plan)
+            else:
+                cursor.execute('SET enable_seqscan = off')
+                cursor.execute(f'EXPLAIN {statement}', parameters)
+                plan = '\n'.join(row[0] for row in cursor.fetchall())
+                scans = POSTGRES_SCAN.findall(plan)
+            return plan, [table for table in scans if table not in CATALOG_TABLES]
+        finally:
+            raw.rollback()
+            raw.close()
+
+    client = app.test_client()
+    reservation_id = None
+    failures = 0
+    for method, path, body, role in ROUTES:
+        if path == '/api/release':
+            body = {'reservation_id': reservation_id}
+        captured.clear()
+        response = client.open(path, method=method, json=body,
+                               headers={'Authorization': f'Bearer {tokens[role]}'})
+        if path == '/api/reserve' and response.status_code == 201:
+            reservation_id = response.get_json()['reservation']['id']
+
+        statements = list(captured)
+        captured.clear()
+        print(f"{method} {path} -> {response.status_code} ({len(statements)} statements)")
+        for statement, parameters in statements:
+            plan, scans = explain(statement, parameters)
+            full_scan = bool(scans) and bool(FILTERED.search(statement))
+            if full_scan:
+                failures += 1
+                print(f"  FULL SCAN on {', '.join(sorted(set(scans)))}:\n    {' '.join(statement.split())}")
+            if full_scan or args.verbose:
+                print('    ' + plan.replace('\n', '\n    '))
+
+    print(f"\n{failures} statement(s) fell back to a full scan" if failures else "\nNo full scans behind filtered queries")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
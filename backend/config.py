@@ -8,4 +8,21 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///parking.db'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY') or 'jwt-secret-key-change-in-production'
-    JWT_ACCESS_TOKEN_EXPIRES = 3600
\ No newline at end of file
+    JWT_ACCESS_TOKEN_EXPIRES = 3600
+    # Password hashing: bcrypt cost for new hashes, and the per-process pool that runs it
+    BCRYPT_ROUNDS = int(os.environ.get('BCRYPT_ROUNDS', 12))  # Older hashes are upgraded on the next successful login
+    BCRYPT_WORKERS = int(os.environ.get('BCRYPT_WORKERS', 2))  # Hashing threads per process; 0 hashes on the request thread
+    BCRYPT_MAX_PENDING = int(os.environ.get('BCRYPT_MAX_PENDING', 16))  # Running plus queued hashes before logins get 503
+    MAX_BATCH_SIZE = int(os.environ.get('MAX_BATCH_SIZE', 100))  # Items per /api/reserve/batch or /api/release/batch call
+    IMPORT_ASYNC_THRESHOLD = int(os.environ.get('IMPORT_ASYNC_THRESHOLD', 1024 * 1024))  # Uploads larger than this (bytes) import via Celery
+    PAGE_SIZE = int(os.environ.get('PAGE_SIZE', 100))  # Default rows per page on paginated list endpoints
+    MAX_PAGE_SIZE = int(os.environ.get('MAX_PAGE_SIZE', 1000))  # Upper bound for ?limit= on those endpoints
+    # Redis cache client: one shared, bounded connection pool per process
+    REDIS_HOST = os.environ.get('REDIS_HOST', 'localhost')
+    REDIS_PORT = int(os.environ.get('REDIS_PORT', 6379))
+    REDIS_DB = int(os.environ.get('REDIS_DB', 0))
+    REDIS_MAX_CONNECTIONS = int(os.environ.get('REDIS_MAX_CONNECTIONS', 50))  # Per process; callers queue beyond this
+    REDIS_POOL_TIMEOUT = float(os.environ.get('REDIS_POOL_TIMEOUT', 2))  # Seconds to wait for a free pooled connection
+    REDIS_SOCKET_TIMEOUT = float(os.environ.get('REDIS_SOCKET_TIMEOUT', 1))  # Seconds per command before giving up
+    REDIS_CONNECT_TIMEOUT = float(os.environ.get('REDIS_CONNECT_TIMEOUT', 1))
+    REDIS_HEALTH_CHECK_INTERVAL = int(os.environ.get('REDIS_HEALTH_CHECK_INTERVAL', 30))  # Ping idle connections before reuse
@@ -6,6 +6,7 @@ from datetime import datetime, timedelta
 import random
 
 from models import db, User, ParkingLot, ParkingSpot, Reservation
+from inventory import reconcile_lot_counters
 
 LOT_BLUEPRINTS = [
     {
@@ -168,6 +169,7 @@ def seed_demo_data(force_reset=False):
     lots = _ensure_lots()
     users = _ensure_users()
     _create_reservations(users, lots)
+    reconcile_lot_counters()
 
     print("✅ Demo dataset ensured. Lots: {}, Users: {}, Reservations: {}".format(
         ParkingLot.query.count(),
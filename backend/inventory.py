@@ -0,0 +1,87 @@
+"""
+Helpers that keep the denormalised availability counters on ParkingLot
+in step with the parking_spot table, and provision spots in bulk.
+"""
+from sqlalchemy import delete, func, insert, or_, select
+
+from models import db, ParkingLot, ParkingSpot
+
+# Rows per INSERT/DELETE statement when provisioning spots
+SPOT_BATCH_SIZE = 1000
+
+
+def adjust_lot_counters(lot_id, available=0, occupied=0):
+    """Shift a lot's counters by the given deltas inside the current transaction"""
+    ParkingLot.query.filter_by(id=lot_id).update({
+        ParkingLot.available_spots: ParkingLot.available_spots + available,
+        ParkingLot.occupied_spots: ParkingLot.occupied_spots + occupied,
+    })
+
+
+def reconcile_lot_counters(lot_id=None):
+    """Recount spots per lot and repair counters that drifted; returns the number of lots fixed"""
+    available = select(func.count(ParkingSpot.id)).where(
+        ParkingSpot.lot_id == ParkingLot.id, ParkingSpot.status == 'A'
+    ).scalar_subquery()
+    occupied = select(func.count(ParkingSpot.id)).where(
+        ParkingSpot.lot_id == ParkingLot.id, ParkingSpot.status == 'O'
+    ).scalar_subquery()
+
+    query = ParkingLot.query.filter(or_(
+        ParkingLot.available_spots.is_(None),
+        ParkingLot.occupied_spots.is_(None),
+        ParkingLot.available_spots != available,
+        ParkingLot.occupied_spots != occupied,
+    ))
+    if lot_id is not None:
+        query = query.filter(ParkingLot.id == lot_id)
+
+    repaired = query.update({
+        ParkingLot.available_spots: available,
+        ParkingLot.occupied_spots: occupied,
+    }, synchronize_session=False)
+    db.session.commit()
+    return repaired
+
+
+def insert_spot_rows(rows):
+    """Insert an iterable of parking_spot mappings in batches of SPOT_BATCH_SIZE; returns rows inserted"""
+    inserted = 0
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == SPOT_BATCH_SIZE:
+            db.session.execute(insert(ParkingSpot), batch)
+            inserted += len(batch)
+            batch = []
+    if batch:
+        db.session.execute(insert(ParkingSpot), batch)
+        inserted += len(batch)
+    return inserted
+
+
+def bulk_create_spots(lot_id, first_number, last_number):
+    """Insert available spots A<first_number>..A<last_number> for a lot in batched statements"""
+    return insert_spot_rows(
+        {'lot_id': lot_id, 'spot_number': f"A{i}", 'status': 'A'} for i in range(first_number, last_number + 1)
+    )
+
+
+def bulk_remove_spots(lot_id, count):
+    """Delete up to count available spots (newest first) from a lot in batched statements; returns rows removed"""
+    removed = 0
+    while removed < count:
+        batch = min(SPOT_BATCH_SIZE, count - removed)
+        # Ids first, then DELETE ... IN (list): MySQL/MariaDB reject a LIMIT subquery on the table being deleted from
+        newest_free = db.session.execute(select(ParkingSpot.id).where(
+            ParkingSpot.lot_id == lot_id, ParkingSpot.status == 'A'
+        ).order_by(ParkingSpot.id.desc()).limit(batch)).scalars().all()
+        if not newest_free:
+            break
+        # Status checked again: a spot reserved since the SELECT stays
+        result = db.session.execute(
+            delete(ParkingSpot).where(ParkingSpot.id.in_(newest_free), ParkingSpot.status == 'A'),
+            execution_options={'synchronize_session': False}
+        )
+        removed += result.rowcount
+    return removed
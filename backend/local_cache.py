@@ -0,0 +1,88 @@
+"""
+Per-process LRU used as the first cache tier in front of Redis.
+
+Holds already-decoded values, so a hit skips both the Redis round trip and
+json.loads. Size is bounded by entry count and every entry expires after at
+most the configured TTL, which caps staleness even if an invalidation
+message is missed. Values are shared between requests and must be treated
+as read-only by callers.
+
+Every eviction bumps a generation counter. A reader that fetched a value
+from Redis passes the generation it saw before the fetch to set(); if an
+invalidation landed in between, the write is dropped instead of caching a
+value that is already stale.
+"""
+import fnmatch
+import threading
+import time
+from collections import OrderedDict
+
+
+class LocalCache:
+    """Thread-safe LRU with per-entry expiry and an invalidation generation"""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.generation = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+
+    def get(self, key, default=None):
+        """Return a live entry and mark it most recently used"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            if entry[0] <= time.monotonic():
+                del self._entries[key]
+                return default
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value, ttl=None, generation=None):
+        """Store a value for min(ttl, self.ttl) seconds unless the cache was invalidated since generation"""
+        if not self.maxsize:
+            return False
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return False
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return True
+
+    def delete(self, *keys):
+        """Drop specific keys"""
+        with self._lock:
+            self.generation += 1
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def delete_prefix(self, prefix):
+        """Drop every key starting with prefix"""
+        with self._lock:
+            self.generation += 1
+            for key in [key for key in self._entries if key.startswith(prefix)]:
+                del self._entries[key]
+
+    def delete_matching(self, pattern):
+        """Drop every key matching a glob pattern (Redis KEYS syntax for the common cases)"""
+        with self._lock:
+            self.generation += 1
+            for key in [key for key in self._entries if fnmatch.fnmatchcase(key, pattern)]:
+                del self._entries[key]
+
+    def clear(self):
+        """Drop everything"""
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
@@ -0,0 +1,76 @@
+"""
+Per-lot cache fragments for the lot and spot listings.
+
+Every lot has its own cache namespace (lot:<id>). A reservation or release
+invalidates only that namespace, so the cached data of every other lot stays
+warm under a steady stream of bookings:
+
+- /api/lots and the admin dashboard take the static lot fields from one
+  cached listing that bookings never touch, and overlay the live free
+  counts from the Redis availability hash (see availability.py). A warm
+  listing is two Redis reads and no SQL.
+- Cached /api/spots pages are tagged with the lots they contain (or the
+  lot they are filtered to) and are only rebuilt when one of those lots
+  changes.
+
+Adding or removing lots (or spots) still retires the whole listing through
+the api:lots / api:spots namespaces.
+"""
+from availability import free_counts, AVAILABILITY_NAMESPACE
+from cache import cache_fetch, cache_invalidate, versioned_key, cache_key
+from models import ParkingLot
+from serializers import LOT_SUMMARY_COLUMNS, serialize_lot_summaries
+
+# The listing only changes with the inventory, so it can live long
+LOT_SUMMARY_EXPIRE = 300
+SPOT_STATUS_NAMESPACE = "api:spots:status"
+# Retired on every booking: status-filtered spot pages, the admin dashboard totals and the free counts
+BOOKING_NAMESPACES = (SPOT_STATUS_NAMESPACE, "api:stats", AVAILABILITY_NAMESPACE)
+# Retired when lots or spots are added, removed or edited
+INVENTORY_NAMESPACES = ("api:lots", "api:spots") + BOOKING_NAMESPACES
+
+
+def lot_namespace(lot_id):
+    """Cache namespace holding everything cached for one lot"""
+    return f"lot:{int(lot_id)}"
+
+
+def invalidate_lots(*lot_ids, inventory=False):
+    """
+    Retire the cached data of the given lots after a booking, in one round trip.
+
+    inventory=True also retires the full lot and spot listings, for changes that
+    add or remove lots or spots rather than flip a spot's status.
+    """
+    namespaces = [lot_namespace(lot_id) for lot_id in set(lot_ids)]
+    cache_invalidate(*namespaces, *(INVENTORY_NAMESPACES if inventory else BOOKING_NAMESPACES))
+
+
+def _all_summaries():
+    return serialize_lot_summaries(ParkingLot.query.with_entities(*LOT_SUMMARY_COLUMNS).order_by(ParkingLot.id))
+
+
+def lot_summaries():
+    """Summaries of every lot in id order, with available_spots read from the availability hash"""
+    summaries = cache_fetch(versioned_key("api:lots", "summaries"), _all_summaries, LOT_SUMMARY_EXPIRE,
+                            stale_key=cache_key("api:lots", "stale", "summaries"))
+    free = free_counts()
+    # The cached listing is shared; overlay the live counts on copies. A lot the hash does not
+    # hold yet keeps the count it was cached with until the next reconciliation adds it.
+    return [{**summary, 'available_spots': free.get(summary['id'], summary['available_spots'])}
+            for summary in summaries]
+
+
+def spot_page_namespace(lot_id=None, status=None):
+    """Namespace for a cached page of /api/spots"""
+    # A status filter across lots changes membership whenever any spot flips, so those pages
+    # live in a namespace that every booking retires; everything else is tagged per lot
+    return SPOT_STATUS_NAMESPACE if status and not lot_id else "api:spots"
+
+
+def spot_page_tags(lot_id=None):
+    """tags() for cache_fetch on a page of spots or a spot map: the filtered lot, or the lots it shows"""
+    if lot_id:
+        return lambda page: [lot_namespace(lot_id)]
+    return lambda page: sorted({lot_namespace(item['lot_id']) for item in page['spots']} if 'spots' in page
+                               else {lot_namespace(lot['id']) for lot in page['lots']})
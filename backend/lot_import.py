@@ -0,0 +1,182 @@
+"""
+Streaming bulk import of parking lots from CSV or NDJSON.
+
+Rows are read one at a time from a text stream, validated, and written in
+chunked transactions: each chunk inserts its lots with a single multi-row
+INSERT and their spots through inventory's batched spot insert. Only the
+current chunk and a capped list of row errors are held in memory, so usage
+stays flat regardless of file size.
+
+CSV files need a header row; NDJSON files hold one JSON object per line.
+Both use the same field names as POST /api/admin/lots.
+"""
+import csv
+import io
+import json
+import os
+import shutil
+import uuid
+
+from sqlalchemy import insert
+
+from models import db, ParkingLot
+from inventory import insert_spot_rows
+
+REQUIRED_FIELDS = ('prime_location_name', 'address', 'pin_code', 'price_per_hour', 'number_of_spots')
+FORMATS = ('csv', 'ndjson')
+IMPORT_CHUNK_SIZE = 200
+MAX_SPOTS_PER_LOT = 100000
+MAX_REPORTED_ERRORS = 100
+
+# Uploads handed to the Celery worker are staged here
+IMPORT_DIR = os.path.join(os.path.dirname(__file__), 'imports')
+
+
+def detect_format(filename=None, content_type=None, requested=None):
+    """Pick 'csv' or 'ndjson' from an explicit request, the file extension or the content type"""
+    if requested:
+        return requested.lower() if requested.lower() in FORMATS else None
+    name = (filename or '').lower()
+    if name.endswith(('.ndjson', '.jsonl')) or 'ndjson' in (content_type or ''):
+        return 'ndjson'
+    return 'csv'
+
+
+def text_stream(binary_stream):
+    """Wrap a binary upload stream so rows can be decoded incrementally"""
+    return io.TextIOWrapper(binary_stream, encoding='utf-8-sig', newline='')
+
+
+def stage_upload(binary_stream, fmt):
+    """Copy an upload to IMPORT_DIR in fixed-size chunks and return the staged path"""
+    os.makedirs(IMPORT_DIR, exist_ok=True)
+    path = os.path.join(IMPORT_DIR, f"lots_{uuid.uuid4().hex}.{fmt}")
+    with open(path, 'wb') as staged:
+        shutil.copyfileobj(binary_stream, staged, 64 * 1024)
+    return path
+
+
+def iter_rows(stream, fmt):
+    """Yield (row_number, record, error) for each data row without reading the whole stream"""
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for record in reader:
+            yield reader.line_num, record, None
+        return
+
+    for row_number, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as exc:
+            yield row_number, None, f'Invalid JSON: {exc}'
+            continue
+        if not isinstance(record, dict):
+            yield row_number, None, 'Expected a JSON object'
+            continue
+        yield row_number, record, None
+
+
+def validate_row(record):
+    """Return (values, error) for a raw record, coercing types the way create_lot expects"""
+    missing = [field for field in REQUIRED_FIELDS if record.get(field) in (None, '')]
+    if missing:
+        return None, f"Missing fields: {', '.join(missing)}"
+
+    name = str(record['prime_location_name']).strip()
+    address = str(record['address']).strip()
+    pin_code = str(record['pin_code']).strip()
+    if len(name) > 100 or len(address) > 200 or len(pin_code) > 10:
+        return None, 'Field too long (name 100, address 200, pin_code 10 characters max)'
+
+    try:
+        price_per_hour = float(record['price_per_hour'])
+    except (TypeError, ValueError):
+        return None, 'price_per_hour must be a number'
+    if price_per_hour < 0:
+        return None, 'price_per_hour cannot be negative'
+
+    try:
+        number_of_spots = int(record['number_of_spots'])
+    except (TypeError, ValueError):
+        return None, 'number_of_spots must be an integer'
+    if not 0 < number_of_spots <= MAX_SPOTS_PER_LOT:
+        return None, f'number_of_spots must be between 1 and {MAX_SPOTS_PER_LOT}'
+
+    return {
+        'prime_location_name': name,
+        'address': address,
+        'pin_code': pin_code,
+        'price_per_hour': price_per_hour,
+        'number_of_spots': number_of_spots,
+        'available_spots': number_of_spots,
+        'occupied_spots': 0,
+    }, None
+
+
+def _write_chunk(chunk):
+    # One INSERT for the chunk's lots, then every spot of those lots in batches
+    lot_ids = db.session.scalars(
+        insert(ParkingLot).returning(ParkingLot.id, sort_by_parameter_order=True),
+        [values for _, values in chunk]
+    ).all()
+    spots = insert_spot_rows(
+        {'lot_id': lot_id, 'spot_number': f"A{i}", 'status': 'A'}
+        for lot_id, (_, values) in zip(lot_ids, chunk)
+        for i in range(1, values['number_of_spots'] + 1)
+    )
+    db.session.commit()
+    return len(lot_ids), spots
+
+
+def import_lots(stream, fmt, chunk_size=IMPORT_CHUNK_SIZE, progress=None):
+    """Import lots from a text stream; progress(summary) is called after every committed chunk"""
+    summary = {
+        'rows_read': 0,
+        'lots_created': 0,
+        'spots_created': 0,
+        'error_count': 0,
+        'errors': [],
+    }
+
+    def record_error(row_number, message):
+        summary['error_count'] += 1
+        if len(summary['errors']) < MAX_REPORTED_ERRORS:
+            summary['errors'].append({'row': row_number, 'error': message})
+
+    def flush(chunk):
+        try:
+            lots, spots = _write_chunk(chunk)
+        except Exception as exc:
+            db.session.rollback()
+            for row_number, _ in chunk:
+                record_error(row_number, f'Chunk failed to save: {exc}')
+            return
+        summary['lots_created'] += lots
+        summary['spots_created'] += spots
+        if progress:
+            progress(summary)
+
+    chunk = []
+    try:
+        for row_number, record, error in iter_rows(stream, fmt):
+            summary['rows_read'] += 1
+            values = None
+            if not error:
+                values, error = validate_row(record)
+            if error:
+                record_error(row_number, error)
+                continue
+
+            chunk.append((row_number, values))
+            if len(chunk) >= chunk_size:
+                flush(chunk)
+                chunk = []
+    except (UnicodeDecodeError, csv.Error) as exc:
+        record_error(summary['rows_read'] + 1, f'Unreadable input: {exc}')
+
+    if chunk:
+        flush(chunk)
+    return summary
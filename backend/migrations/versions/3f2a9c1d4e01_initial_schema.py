@@ -0,0 +1,104 @@
+"""Initial schema
+
+Revision ID: 3f2a9c1d4e01
+Revises: 
+Create Date: 2026-10-18 12:30:00.000000
+
+Databases bootstrapped by the old db.create_all() call already have these
+tables, so only missing tables are created; the per-lot availability
+counters are added and backfilled where they are absent.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f2a9c1d4e01'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    tables = set(inspector.get_table_names())
+
+    if 'user' not in tables:
+        op.create_table(
+            'user',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('username', sa.String(length=50), nullable=False),
+            sa.Column('email', sa.String(length=100), nullable=False),
+            sa.Column('phone_number', sa.String(length=15), nullable=True),
+            sa.Column('address', sa.String(length=200), nullable=True),
+            sa.Column('pincode', sa.String(length=10), nullable=True),
+            sa.Column('password', sa.String(length=100), nullable=False),
+            sa.Column('role', sa.String(length=10), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.Column('last_visit', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('username')
+        )
+
+    if 'parking_lot' not in tables:
+        op.create_table(
+            'parking_lot',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('prime_location_name', sa.String(length=100), nullable=False),
+            sa.Column('address', sa.String(length=200), nullable=False),
+            sa.Column('pin_code', sa.String(length=10), nullable=False),
+            sa.Column('price_per_hour', sa.Float(), nullable=True),
+            sa.Column('number_of_spots', sa.Integer(), nullable=False),
+            sa.Column('available_spots', sa.Integer(), server_default='0', nullable=False),
+            sa.Column('occupied_spots', sa.Integer(), server_default='0', nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('id')
+        )
+    else:
+        columns = {column['name'] for column in inspector.get_columns('parking_lot')}
+        with op.batch_alter_table('parking_lot') as batch_op:
+            if 'available_spots' not in columns:
+                batch_op.add_column(sa.Column('available_spots', sa.Integer(), server_default='0', nullable=False))
+            if 'occupied_spots' not in columns:
+                batch_op.add_column(sa.Column('occupied_spots', sa.Integer(), server_default='0', nullable=False))
+
+    if 'parking_spot' not in tables:
+        op.create_table(
+            'parking_spot',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('lot_id', sa.Integer(), nullable=False),
+            sa.Column('spot_number', sa.String(length=10), nullable=True),
+            sa.Column('status', sa.String(length=1), nullable=True),
+            sa.ForeignKeyConstraint(['lot_id'], ['parking_lot.id'], ),
+            sa.PrimaryKeyConstraint('id')
+        )
+    else:
+        # Existing spots: bring the freshly added counters in line with them
+        op.execute(
+            "UPDATE parking_lot SET "
+            "available_spots = (SELECT COUNT(*) FROM parking_spot "
+            "WHERE parking_spot.lot_id = parking_lot.id AND parking_spot.status = 'A'), "
+            "occupied_spots = (SELECT COUNT(*) FROM parking_spot "
+            "WHERE parking_spot.lot_id = parking_lot.id AND parking_spot.status = 'O')"
+        )
+
+    if 'reservation' not in tables:
+        op.create_table(
+            'reservation',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('spot_id', sa.Integer(), nullable=False),
+            sa.Column('parking_timestamp', sa.DateTime(), nullable=True),
+            sa.Column('leaving_timestamp', sa.DateTime(), nullable=True),
+            sa.Column('parking_cost', sa.Float(), nullable=True),
+            sa.ForeignKeyConstraint(['spot_id'], ['parking_spot.id'], ),
+            sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+            sa.PrimaryKeyConstraint('id')
+        )
+
+
+def downgrade():
+    op.drop_table('reservation')
+    op.drop_table('parking_spot')
+    op.drop_table('parking_lot')
+    op.drop_table('user')
@@ -0,0 +1,44 @@
+"""Indexes for the hot query predicates
+
+Revision ID: 8b7d51e0c6a2
+Revises: 3f2a9c1d4e01
+Create Date: 2026-10-18 12:35:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8b7d51e0c6a2'
+down_revision = '3f2a9c1d4e01'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('user') as batch_op:
+        batch_op.create_index('ix_user_role_created_at', ['role', 'created_at'], unique=False)
+
+    with op.batch_alter_table('parking_spot') as batch_op:
+        batch_op.create_index('ix_parking_spot_lot_id_status', ['lot_id', 'status'], unique=False)
+
+    with op.batch_alter_table('reservation') as batch_op:
+        batch_op.create_index('ix_reservation_user_id_leaving_timestamp', ['user_id', 'leaving_timestamp'], unique=False)
+        batch_op.create_index('ix_reservation_user_id_parking_timestamp', ['user_id', 'parking_timestamp'], unique=False)
+        batch_op.create_index('ix_reservation_active', ['user_id', 'spot_id'], unique=False,
+                              sqlite_where=sa.text('leaving_timestamp IS NULL'),
+                              postgresql_where=sa.text('leaving_timestamp IS NULL'))
+
+
+def downgrade():
+    with op.batch_alter_table('reservation') as batch_op:
+        batch_op.drop_index('ix_reservation_active')
+        batch_op.drop_index('ix_reservation_user_id_parking_timestamp')
+        batch_op.drop_index('ix_reservation_user_id_leaving_timestamp')
+
+    with op.batch_alter_table('parking_spot') as batch_op:
+        batch_op.drop_index('ix_parking_spot_lot_id_status')
+
+    with op.batch_alter_table('user') as batch_op:
+        batch_op.drop_index('ix_user_role_created_at')
@@ -0,0 +1,79 @@
+"""Full-text search index over lots, users and spots
+
+Revision ID: c41e7f2b9d35
+Revises: 8b7d51e0c6a2
+Create Date: 2026-10-18 13:00:00.000000
+
+SQLite gets FTS5 external-content tables kept in sync by triggers, so bulk
+inserts that bypass the ORM are indexed too. The update triggers only fire
+for the searchable columns; counter and status updates never touch them.
+Postgres gets GIN indexes over to_tsvector('simple', ...) expressions, which
+the planner keeps current by itself. search.py queries both.
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'c41e7f2b9d35'
+down_revision = '8b7d51e0c6a2'
+branch_labels = None
+depends_on = None
+
+# (fts table, base table, indexed columns)
+SQLITE_INDEXES = [
+    ('lot_search', 'parking_lot', ['prime_location_name', 'address', 'pin_code']),
+    ('user_search', 'user', ['username', 'email']),
+    ('spot_search', 'parking_spot', ['spot_number']),
+]
+
+# (index name, table, tsvector expression) - must match search.py exactly
+POSTGRES_INDEXES = [
+    ('ix_parking_lot_search', 'parking_lot',
+     "to_tsvector('simple', coalesce(prime_location_name, '') || ' ' || coalesce(address, '') || ' ' || coalesce(pin_code, ''))"),
+    ('ix_user_search', '"user"',
+     "to_tsvector('simple', coalesce(username, '') || ' ' || coalesce(email, ''))"),
+    ('ix_parking_spot_search', 'parking_spot',
+     "to_tsvector('simple', coalesce(spot_number, ''))"),
+]
+
+
+def _sqlite_upgrade():
+    for fts, table, columns in SQLITE_INDEXES:
+        cols = ', '.join(columns)
+        new_values = ', '.join(f'new.{column}' for column in columns)
+        old_values = ', '.join(f'old.{column}' for column in columns)
+        op.execute(f"CREATE VIRTUAL TABLE {fts} USING fts5({cols}, content='{table}', content_rowid='id', "
+                   f"tokenize='unicode61', prefix='2 3')")
+        op.execute(f"CREATE TRIGGER {fts}_ai AFTER INSERT ON \"{table}\" BEGIN "
+                   f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new_values}); END")
+        op.execute(f"CREATE TRIGGER {fts}_ad AFTER DELETE ON \"{table}\" BEGIN "
+                   f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_values}); END")
+        op.execute(f"CREATE TRIGGER {fts}_au AFTER UPDATE OF {cols} ON \"{table}\" BEGIN "
+                   f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_values}); "
+                   f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new_values}); END")
+        op.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
+def _sqlite_downgrade():
+    for fts, _, _ in SQLITE_INDEXES:
+        for suffix in ('ai', 'ad', 'au'):
+            op.execute(f"DROP TRIGGER IF EXISTS {fts}_{suffix}")
+        op.execute(f"DROP TABLE IF EXISTS {fts}")
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        _sqlite_upgrade()
+    elif dialect == 'postgresql':
+        for name, table, expression in POSTGRES_INDEXES:
+            op.execute(f"CREATE INDEX {name} ON {table} USING gin ({expression})")
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        _sqlite_downgrade()
+    elif dialect == 'postgresql':
+        for name, _, _ in POSTGRES_INDEXES:
+            op.execute(f"DROP INDEX IF EXISTS {name}")
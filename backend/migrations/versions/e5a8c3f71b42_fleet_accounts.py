@@ -0,0 +1,27 @@
+"""Fleet flag on user accounts
+
+Revision ID: e5a8c3f71b42
+Revises: c41e7f2b9d35
+Create Date: 2026-10-19 09:00:00.000000
+
+Only fleet accounts may hold several active reservations through
+/api/reserve/batch. A plain ADD COLUMN rather than a batch table rebuild,
+which on SQLite would drop the user_search triggers.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5a8c3f71b42'
+down_revision = 'c41e7f2b9d35'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('user', sa.Column('fleet', sa.Boolean(), nullable=False, server_default=sa.false()))
+
+
+def downgrade():
+    op.drop_column('user', 'fleet')
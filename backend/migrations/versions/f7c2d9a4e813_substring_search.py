@@ -0,0 +1,91 @@
+"""Substring search over lots, usernames, emails and spot numbers
+
+Revision ID: f7c2d9a4e813
+Revises: e5a8c3f71b42
+Create Date: 2026-10-19 10:00:00.000000
+
+Word-prefix matching misses what admins type for these columns: "15" should
+find spot "A15", "oad" the lot on "MG Road" and a fragment from the middle of
+an email the user, as the ILIKE search did before the full-text index. SQLite
+rebuilds lot_search, user_search and spot_search with the trigram tokenizer
+(SQLite 3.34+; older versions keep the word index). Postgres replaces their
+tsvector indexes with pg_trgm GIN indexes on the lower-cased text.
+"""
+import sqlite3
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'f7c2d9a4e813'
+down_revision = 'e5a8c3f71b42'
+branch_labels = None
+depends_on = None
+
+# (fts table, base table, indexed columns)
+SQLITE_INDEXES = [
+    ('lot_search', 'parking_lot', ['prime_location_name', 'address', 'pin_code']),
+    ('user_search', 'user', ['username', 'email']),
+    ('spot_search', 'parking_spot', ['spot_number']),
+]
+
+# (index name, table, expression) - must match search.py exactly
+POSTGRES_INDEXES = [
+    ('ix_parking_lot_substring', 'parking_lot',
+     "lower(coalesce(prime_location_name, '') || ' ' || coalesce(address, '') || ' ' || coalesce(pin_code, ''))"),
+    ('ix_user_substring', '"user"', "lower(coalesce(username, '') || ' ' || coalesce(email, ''))"),
+    ('ix_parking_spot_substring', 'parking_spot', "lower(coalesce(spot_number, ''))"),
+]
+
+# The word indexes these replace, as created by the search-index revision
+POSTGRES_WORD_INDEXES = [
+    ('ix_parking_lot_search', 'parking_lot',
+     "to_tsvector('simple', coalesce(prime_location_name, '') || ' ' || coalesce(address, '') || ' ' || coalesce(pin_code, ''))"),
+    ('ix_user_search', '"user"', "to_tsvector('simple', coalesce(username, '') || ' ' || coalesce(email, ''))"),
+    ('ix_parking_spot_search', 'parking_spot', "to_tsvector('simple', coalesce(spot_number, ''))"),
+]
+
+
+def _sqlite_rebuild(tokenize):
+    for fts, table, columns in SQLITE_INDEXES:
+        cols = ', '.join(columns)
+        new_values = ', '.join(f'new.{column}' for column in columns)
+        old_values = ', '.join(f'old.{column}' for column in columns)
+        for suffix in ('ai', 'ad', 'au'):
+            op.execute(f"DROP TRIGGER IF EXISTS {fts}_{suffix}")
+        op.execute(f"DROP TABLE IF EXISTS {fts}")
+        op.execute(f"CREATE VIRTUAL TABLE {fts} USING fts5({cols}, content='{table}', content_rowid='id', "
+                   f"tokenize={tokenize})")
+        op.execute(f"CREATE TRIGGER {fts}_ai AFTER INSERT ON \"{table}\" BEGIN "
+                   f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new_values}); END")
+        op.execute(f"CREATE TRIGGER {fts}_ad AFTER DELETE ON \"{table}\" BEGIN "
+                   f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_values}); END")
+        op.execute(f"CREATE TRIGGER {fts}_au AFTER UPDATE OF {cols} ON \"{table}\" BEGIN "
+                   f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_values}); "
+                   f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new_values}); END")
+        op.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        if sqlite3.sqlite_version_info >= (3, 34, 0):
+            _sqlite_rebuild("'trigram'")
+    elif dialect == 'postgresql':
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        for name, _, _ in POSTGRES_WORD_INDEXES:
+            op.execute(f"DROP INDEX IF EXISTS {name}")
+        for name, table, expression in POSTGRES_INDEXES:
+            op.execute(f"CREATE INDEX {name} ON {table} USING gin ({expression} gin_trgm_ops)")
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        if sqlite3.sqlite_version_info >= (3, 34, 0):
+            _sqlite_rebuild("'unicode61', prefix='2 3'")
+    elif dialect == 'postgresql':
+        for name, _, _ in POSTGRES_INDEXES:
+            op.execute(f"DROP INDEX IF EXISTS {name}")
+        for name, table, expression in POSTGRES_WORD_INDEXES:
+            op.execute(f"CREATE INDEX {name} ON {table} USING gin ({expression})")
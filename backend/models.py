@@ -1,13 +1,28 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
 from datetime import datetime
-import bcrypt
+import sqlite3
+from password_hashing import hash_password, check_password, needs_rehash
 
 # Initialize SQLAlchemy database instance
 db = SQLAlchemy()
 
+@event.listens_for(Engine, 'connect')
+def configure_sqlite_connection(dbapi_connection, connection_record):
+    """Enable WAL journaling on SQLite so reservation commits are short and readers never block writers"""
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.execute('PRAGMA synchronous=NORMAL')
+        cursor.close()
+
 class User(db.Model):
     """User model representing registered users and administrators"""
     __tablename__ = 'user'
+    __table_args__ = (
+        db.Index('ix_user_role_created_at', 'role', 'created_at'),  # Role filters and newest-user listings
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(50), unique=True, nullable=False)
@@ -17,30 +32,29 @@ class User(db.Model):
     pincode = db.Column(db.String(10), nullable=True)
     password = db.Column(db.String(100), nullable=False)  # Stored as bcrypt hash
     role = db.Column(db.String(10), default='user')  # 'user' or 'admin'
+    fleet = db.Column(db.Boolean, nullable=False, default=False, server_default=db.false())  # May reserve in batches
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     last_visit = db.Column(db.DateTime, default=datetime.utcnow)
     
+    # passive_deletes: rows are removed with bulk deletes, never by loading the collection first
+    reservations = db.relationship('Reservation', back_populates='user', passive_deletes=True)
+    
     def set_password(self, password):
-        """Hash and store user password using bcrypt"""
-        self.password = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+        """Hash and store user password using bcrypt (on the hashing pool)"""
+        self.password = hash_password(password)
     
     def check_password(self, password):
-        """Verify provided password against stored hash"""
-        return bcrypt.checkpw(password.encode('utf-8'), self.password.encode('utf-8'))
+        """Verify provided password against stored hash (on the hashing pool)"""
+        return check_password(password, self.password)
+    
+    def password_needs_rehash(self):
+        """True when the stored hash was made at a bcrypt cost other than BCRYPT_ROUNDS"""
+        return needs_rehash(self.password)
     
     def to_dict(self):
         """Convert user object to dictionary for JSON serialization"""
-        return {
-            'id': self.id,
-            'username': self.username,
-            'email': self.email,
-            'phone_number': self.phone_number,
-            'address': self.address,
-            'pincode': self.pincode,
-            'role': self.role,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'last_visit': self.last_visit.isoformat() if self.last_visit else None
-        }
+        from serializers import serialize_users  # serializers imports the models
+        return serialize_users([self])[0]
     
     def __repr__(self):
         return f'<User {self.username}>'
@@ -55,26 +69,44 @@ class ParkingLot(db.Model):
     pin_code = db.Column(db.String(10), nullable=False)
     price_per_hour = db.Column(db.Float, default=10.0)  # Hourly rate in rupees
     number_of_spots = db.Column(db.Integer, nullable=False)
+    available_spots = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # Denormalised count of 'A' spots
+    occupied_spots = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # Denormalised count of 'O' spots
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    spots = db.relationship('ParkingSpot', back_populates='lot', passive_deletes=True)
+    
     def __repr__(self):
         return f'<ParkingLot {self.prime_location_name}>'
 
 class ParkingSpot(db.Model):
     """ParkingSpot model representing individual parking spaces"""
     __tablename__ = 'parking_spot'
+    __table_args__ = (
+        db.Index('ix_parking_spot_lot_id_status', 'lot_id', 'status'),  # Free/occupied spots per lot
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     lot_id = db.Column(db.Integer, db.ForeignKey('parking_lot.id'), nullable=False)
     spot_number = db.Column(db.String(10))  # Spot identifier (e.g., "A1", "A2")
     status = db.Column(db.String(1), default='A')  # 'A' = Available, 'O' = Occupied
     
+    lot = db.relationship('ParkingLot', back_populates='spots')
+    reservations = db.relationship('Reservation', back_populates='spot', passive_deletes=True)
+    
     def __repr__(self):
         return f'<Spot {self.spot_number}>'
 
 class Reservation(db.Model):
     """Reservation model tracking parking sessions"""
     __tablename__ = 'reservation'
+    __table_args__ = (
+        db.Index('ix_reservation_user_id_leaving_timestamp', 'user_id', 'leaving_timestamp'),
+        db.Index('ix_reservation_user_id_parking_timestamp', 'user_id', 'parking_timestamp'),
+        # Partial index over open sessions only: active-reservation checks and current-spot lookups
+        db.Index('ix_reservation_active', 'user_id', 'spot_id',
+                 sqlite_where=db.text('leaving_timestamp IS NULL'),
+                 postgresql_where=db.text('leaving_timestamp IS NULL')),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
@@ -83,5 +115,8 @@ class Reservation(db.Model):
     leaving_timestamp = db.Column(db.DateTime)  # Session end time (null if active)
     parking_cost = db.Column(db.Float, default=0.0)  # Calculated total cost
     
+    user = db.relationship('User', back_populates='reservations')
+    spot = db.relationship('ParkingSpot', back_populates='reservations')
+    
     def __repr__(self):
         return f'<Reservation {self.id}>'
\ No newline at end of file
@@ -0,0 +1,95 @@
+"""
+Keyset (cursor) pagination for list endpoints.
+
+A page is fetched with "WHERE sort key is past the cursor ORDER BY sort key
+LIMIT n", so every page costs the same index range scan however deep the
+client has paged, unlike OFFSET. The cursor handed back to the client is an
+opaque base64 token holding the sort-key values of the last row on the page;
+the final sort column must be unique (normally the primary key) so rows
+sharing the other values are neither skipped nor repeated.
+
+Endpoints read ?cursor= and ?limit= (default PAGE_SIZE, capped at
+MAX_PAGE_SIZE). Endpoints that return a bare JSON array report the next
+cursor in the X-Next-Cursor header; endpoints that return an object carry
+it as 'next_cursor'. No header / a null cursor means the last page.
+"""
+import base64
+import json
+from datetime import datetime
+
+from flask import request, current_app
+from sqlalchemy import and_, or_
+
+NEXT_CURSOR_HEADER = 'X-Next-Cursor'
+
+
+class InvalidCursor(ValueError):
+    """Raised when a client sends a cursor that was not issued by this API"""
+
+
+def encode_cursor(values):
+    """Pack sort-key values into an opaque, URL-safe cursor"""
+    raw = json.dumps([value.isoformat() if isinstance(value, datetime) else value for value in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, columns):
+    """Unpack a cursor into values typed like the sort columns"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except ValueError:
+        raise InvalidCursor('Malformed cursor')
+    if not isinstance(values, list) or len(values) != len(columns):
+        raise InvalidCursor('Cursor does not match this listing')
+
+    typed = []
+    for column, value in zip(columns, values):
+        try:
+            if column.type.python_type is datetime:
+                value = datetime.fromisoformat(value)
+            elif column.type.python_type is int:
+                value = int(value)
+        except (TypeError, ValueError):
+            raise InvalidCursor('Cursor does not match this listing')
+        typed.append(value)
+    return typed
+
+
+def page_limit():
+    """Page size requested through ?limit=, bounded to 1..MAX_PAGE_SIZE"""
+    limit = request.args.get('limit', type=int) or current_app.config['PAGE_SIZE']
+    return max(1, min(limit, current_app.config['MAX_PAGE_SIZE']))
+
+
+def _after(columns, values, descending):
+    # (a, b) > (x, y) expanded to a > x OR (a = x AND b > y) so every backend can seek the index
+    clauses = []
+    for i, column in enumerate(columns):
+        step = column < values[i] if descending else column > values[i]
+        clauses.append(and_(*[columns[j] == values[j] for j in range(i)], step))
+    return or_(*clauses)
+
+
+def keyset_page(query, columns, descending=False, cursor=None, limit=None):
+    """
+    Return (rows, next_cursor) for one page of query ordered by columns.
+
+    cursor and limit default to the request's ?cursor= and ?limit=.
+    Raises InvalidCursor for a cursor that does not decode against columns.
+    """
+    cursor = request.args.get('cursor') if cursor is None else cursor
+    limit = page_limit() if limit is None else limit
+
+    if cursor:
+        query = query.filter(_after(columns, decode_cursor(cursor, columns), descending))
+    order = [column.desc() if descending else column.asc() for column in columns]
+    # Fetch one extra row to learn whether another page exists without a COUNT
+    rows = query.order_by(*order).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor([getattr(last, column.key) for column in columns])
+    return rows, next_cursor
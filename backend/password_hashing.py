@@ -0,0 +1,134 @@
+"""
+Bounded bcrypt worker pool for password hashing and checking.
+
+bcrypt is deliberately slow (about 250ms at cost 12). Hashes run on at most
+BCRYPT_WORKERS threads per process, and bcrypt releases the GIL while it
+works, so a login burst uses at most that many cores and other requests
+keep their share of the CPU. The request still waits for its hash: under
+sync/threaded workers its thread is blocked until the result is in, so the
+pool bounds CPU, not request threads. At most BCRYPT_MAX_PENDING hashes may
+be running or queued at once; past that hash_password() and
+check_password() raise HashingBusy straight away, and the auth routes
+answer 503 with Retry-After instead of letting the queue grow without bound.
+
+Under gevent or eventlet monkey-patching a ThreadPoolExecutor's threads are
+greenlets, and a hash would stall the whole hub. The pool then uses real OS
+threads instead: gevent's ThreadPool (BCRYPT_WORKERS threads) or eventlet's
+tpool (sized by EVENTLET_THREADPOOL_SIZE), and only the waiting greenlet
+blocks.
+
+BCRYPT_ROUNDS sets the cost of new hashes. needs_rehash() flags hashes made
+at any other cost so the login routes can rehash them with the password
+they were just given.
+"""
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+
+from config import Config
+
+
+class HashingBusy(Exception):
+    """The hashing queue is full; the caller should retry shortly"""
+
+
+class PasswordHasher:
+    """bcrypt on a per-process thread pool with a cap on outstanding work (workers=0 hashes inline)"""
+
+    def __init__(self, workers, max_pending, rounds):
+        self.workers = workers
+        self.max_pending = max(max_pending, workers)
+        self.rounds = rounds
+        self.rejected = 0
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._lock = threading.Lock()
+        self._call = None
+        self._pid = None
+
+    def _pool(self):
+        # call(fn, *args): run fn on a pool thread and wait for its result
+        with self._lock:
+            if self._pid != os.getpid():
+                # First use in this process (or after a fork, which leaves the parent's threads behind)
+                self._pid = os.getpid()
+                self._call = _green_pool(self.workers) or _thread_pool(self.workers)
+            return self._call
+
+    def _run(self, fn, *args):
+        if not self.workers:
+            return fn(*args)
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise HashingBusy()
+        try:
+            return self._pool()(fn, *args)
+        finally:
+            self._slots.release()
+
+    def hash(self, password):
+        """bcrypt hash of password at the configured cost"""
+        return self._run(_hash, password, self.rounds)
+
+    def check(self, password, hashed_password):
+        """True when password matches hashed_password"""
+        return self._run(_check, password, hashed_password)
+
+    def needs_rehash(self, hashed_password):
+        """True when hashed_password was made at a cost other than the configured one"""
+        try:
+            return int(hashed_password.split('$')[2]) != self.rounds
+        except (IndexError, ValueError):
+            return True
+
+
+def _thread_pool(workers):
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='bcrypt')
+    return lambda fn, *args: executor.submit(fn, *args).result()
+
+
+def _green_pool(workers):
+    # Real OS threads when gevent or eventlet has patched threading; None otherwise
+    gevent_monkey = sys.modules.get('gevent.monkey')
+    if gevent_monkey is not None and gevent_monkey.is_module_patched('threading'):
+        from gevent.threadpool import ThreadPool
+        pool = ThreadPool(workers)
+        return lambda fn, *args: pool.spawn(fn, *args).get()
+    eventlet_patcher = sys.modules.get('eventlet.patcher')
+    if eventlet_patcher is not None and eventlet_patcher.is_monkey_patched('thread'):
+        from eventlet import tpool
+        return tpool.execute
+    return None
+
+
+def _hash(password, rounds):
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds)).decode('utf-8')
+
+
+def _check(password, hashed_password):
+    return bcrypt.checkpw(password.encode('utf-8'), hashed_password.encode('utf-8'))
+
+
+password_hasher = PasswordHasher(
+    workers=Config.BCRYPT_WORKERS,
+    max_pending=Config.BCRYPT_MAX_PENDING,
+    rounds=Config.BCRYPT_ROUNDS
+)
+
+
+def hash_password(password):
+    """Hash password on the bcrypt pool; raises HashingBusy when the queue is full"""
+    return password_hasher.hash(password)
+
+
+def check_password(password, hashed_password):
+    """Check password on the bcrypt pool; raises HashingBusy when the queue is full"""
+    return password_hasher.check(password, hashed_password)
+
+
+def needs_rehash(hashed_password):
+    """True when a stored hash should be replaced at the configured cost"""
+    return password_hasher.needs_rehash(hashed_password)
@@ -0,0 +1,144 @@
+"""
+Contention-safe spot claiming and releasing for the reservation endpoints.
+
+A spot is claimed with a conditional UPDATE ... WHERE status='A', so two
+workers can never both flip the same row: the loser sees rowcount 0 and
+retries with another candidate from the allocator. On databases that support
+it (Postgres, MySQL) a final SELECT ... FOR UPDATE SKIP LOCKED pass picks any
+row not already being claimed instead of queueing behind other transactions.
+Nothing here commits; callers own the transaction.
+"""
+import threading
+
+from sqlalchemy import select, update
+
+from models import db, ParkingSpot, Reservation
+from allocator import spot_allocator
+from inventory import adjust_lot_counters
+
+MAX_CLAIM_ATTEMPTS = 5
+
+_stats_lock = threading.Lock()
+_stats = {'claims': 0, 'conflicts': 0, 'retries': 0, 'exhausted': 0}
+
+
+def _record(**counts):
+    with _stats_lock:
+        for name, value in counts.items():
+            _stats[name] += value
+
+
+def claim_stats():
+    """Snapshot of claim outcomes since start-up (or the last reset)"""
+    with _stats_lock:
+        return dict(_stats)
+
+
+def reset_claim_stats():
+    """Zero the claim counters"""
+    with _stats_lock:
+        for name in _stats:
+            _stats[name] = 0
+
+
+def _try_claim(lot_id, spot_id):
+    result = db.session.execute(
+        update(ParkingSpot)
+        .where(ParkingSpot.id == spot_id, ParkingSpot.lot_id == lot_id, ParkingSpot.status == 'A')
+        .values(status='O')
+    )
+    return result.rowcount == 1
+
+
+def _claim_skip_locked(lot_id):
+    # Row-level locking pass: skip rows other transactions are already claiming
+    spot_id = db.session.execute(
+        select(ParkingSpot.id)
+        .where(ParkingSpot.lot_id == lot_id, ParkingSpot.status == 'A')
+        .limit(1)
+        .with_for_update(skip_locked=True)
+    ).scalar()
+    if spot_id is not None and _try_claim(lot_id, spot_id):
+        return spot_id
+    return None
+
+
+def claim_spot(lot_id, update_counters=True):
+    """Atomically mark a free spot in the lot as occupied and return its id, or None if the lot is full
+
+    Batch callers pass update_counters=False and apply one aggregated counter update per lot.
+    """
+    for attempt in range(MAX_CLAIM_ATTEMPTS):
+        if attempt:
+            _record(retries=1)
+
+        spot_id = spot_allocator.acquire(lot_id)
+        if spot_id is None:
+            break
+
+        if _try_claim(lot_id, spot_id):
+            if update_counters:
+                adjust_lot_counters(lot_id, available=-1, occupied=1)
+            _record(claims=1)
+            return spot_id
+
+        # Another worker took this spot, so the in-memory list for the lot is stale
+        _record(conflicts=1)
+        spot_allocator.invalidate(lot_id)
+
+    if db.engine.dialect.name in ('postgresql', 'mysql', 'mariadb'):
+        spot_id = _claim_skip_locked(lot_id)
+        if spot_id is not None:
+            if update_counters:
+                adjust_lot_counters(lot_id, available=-1, occupied=1)
+            _record(claims=1)
+            return spot_id
+
+    _record(exhausted=1)
+    return None
+
+
+def calculate_parking_cost(parking_timestamp, leaving_timestamp, price_per_hour):
+    """Return (cost, duration_hours) for a session, charging a minimum of one hour"""
+    duration_hours = (leaving_timestamp - parking_timestamp).total_seconds() / 3600
+    if duration_hours < 1:
+        duration_hours = 1
+    return round(duration_hours * price_per_hour, 2), duration_hours
+
+
+def close_reservation(reservation_id, leaving_timestamp, parking_cost):
+    """Stamp an active reservation as finished; returns False if another request already closed it"""
+    result = db.session.execute(
+        update(Reservation)
+        .where(Reservation.id == reservation_id, Reservation.leaving_timestamp.is_(None))
+        .values(leaving_timestamp=leaving_timestamp, parking_cost=parking_cost)
+    )
+    return result.rowcount == 1
+
+
+def release_claimed_spot(lot_id, spot_id, update_counters=True):
+    """Mark an occupied spot as available again inside the current transaction"""
+    result = db.session.execute(
+        update(ParkingSpot)
+        .where(ParkingSpot.id == spot_id, ParkingSpot.status == 'O')
+        .values(status='A')
+    )
+    if result.rowcount == 1:
+        if update_counters:
+            adjust_lot_counters(lot_id, available=1, occupied=-1)
+        return True
+    return False
+
+
+def current_spots(user_ids):
+    """Map each user id to the spot of their newest active reservation, in one query"""
+    user_ids = list(user_ids)
+    if not user_ids:
+        return {}
+    # Served by the partial ix_reservation_active index; ascending ids leave the newest per user in the dict
+    rows = db.session.execute(
+        select(Reservation.user_id, Reservation.spot_id)
+        .where(Reservation.user_id.in_(user_ids), Reservation.leaving_timestamp.is_(None))
+        .order_by(Reservation.id)
+    )
+    return {user_id: spot_id for user_id, spot_id in rows}
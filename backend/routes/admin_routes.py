@@ -1,58 +1,92 @@
-from flask import jsonify, request
+from flask import jsonify, request, current_app
 from models import db, User, ParkingLot, ParkingSpot, Reservation
 from auth import token_required, admin_required
+from inventory import adjust_lot_counters, bulk_create_spots, bulk_remove_spots
+from allocator import spot_allocator
+from reservations import current_spots
+from suggest import suggest_index
+from cache import cache_invalidate, cache_stats, cache_get_many, cache_set_many, namespace_versions, versioned_key
+from token_cache import token_cache_stats
+from lot_cache import invalidate_lots, lot_summaries, INVENTORY_NAMESPACES
+from availability import adjust_availability, set_availability, remove_availability, reset_availability, AVAILABILITY_NAMESPACE
+from conditional import conditional_get
+from lot_import import detect_format, import_lots, stage_upload, text_stream
+from search import search_lot_ids, search_user_ids, search_spot_ids, clamp_limit
+from pagination import keyset_page, NEXT_CURSOR_HEADER
+from streaming import stream_collection, wants_stream, STREAM_CHUNK_SIZE
+from spot_map import encode_spots, spot_map_response, wants_spot_map
+from serializers import (LOT_COLUMNS, LOT_SPOT_COLUMNS, SPOT_COLUMNS, USER_COLUMNS, USER_SUMMARY_COLUMNS,
+                         serialize_lots, serialize_lot_spots, serialize_spots, serialize_users,
+                         serialize_user_summaries)
+from sqlalchemy import func
 
 def register_admin_routes(app):
     
     @app.route('/admin/dashboard')
     @token_required
     @admin_required
+    @conditional_get(("api:stats", "api:users", "api:lots", AVAILABILITY_NAMESPACE))
     def admin_dashboard():
         try:
-            users_count = User.query.filter_by(role='user').count()
-            lots_count = ParkingLot.query.count()
-            spots_count = ParkingSpot.query.count()
-            available = ParkingSpot.query.filter_by(status='A').count()
-            occupied = ParkingSpot.query.filter_by(status='O').count()
-            reservations_count = Reservation.query.count()
+            def inventory_stats():
+                lots_count = ParkingLot.query.count()
+                spots_count = ParkingSpot.query.count()
+                available, occupied = db.session.query(
+                    func.coalesce(func.sum(ParkingLot.available_spots), 0),
+                    func.coalesce(func.sum(ParkingLot.occupied_spots), 0)
+                ).one()
+                reservations_count = Reservation.query.count()
+                
+                # Total revenue from completed reservations (open sessions carry a zero cost until released)
+                total_revenue = db.session.query(func.coalesce(func.sum(Reservation.parking_cost), 0)).scalar()
+                return {
+                    'total_lots': lots_count,
+                    'total_spots': spots_count,
+                    'available_spots': available,
+                    'occupied_spots': occupied,
+                    'total_reservations': reservations_count,
+                    'total_revenue': round(total_revenue, 2)
+                }
             
-            # Calculate total revenue from completed reservations
-            completed_reservations = Reservation.query.filter(Reservation.leaving_timestamp.isnot(None)).all()
-            total_revenue = sum(res.parking_cost for res in completed_reservations if res.parking_cost)
+            def user_stats():
+                users_count = User.query.filter_by(role='user').count()
+                try:
+                    recent = User.query.with_entities(*USER_COLUMNS).filter_by(role='user') \
+                        .order_by(User.created_at.desc()).limit(5).all()
+                except:
+                    recent = User.query.with_entities(*USER_COLUMNS).filter_by(role='user').limit(5).all()
+                return {'total_users': users_count, 'recent_users': serialize_users(recent)}
             
-            try:
-                recent = User.query.filter_by(role='user').order_by(User.created_at.desc()).limit(5).all()
-            except:
-                recent = User.query.filter_by(role='user').limit(5).all()
+            # Two cached fragments: one MGET for the namespace versions, one MGET for the fragments,
+            # and a single pipelined write for whichever had to be rebuilt
+            versions = namespace_versions("api:stats", "api:users")
+            fragments = {
+                versioned_key("api:stats", "dashboard", version=versions["api:stats"]): inventory_stats,
+                versioned_key("api:users", "dashboard", version=versions["api:users"]): user_stats
+            }
+            values = cache_get_many(fragments)
+            rebuilt = {}
+            for i, (key, build) in enumerate(fragments.items()):
+                if values[i] is None:
+                    values[i] = rebuilt[key] = build()
+            if rebuilt:
+                cache_set_many(rebuilt, 30)
+            inventory, users = values
             
-            lots = ParkingLot.query.all()
-            lots_info = []
-            for lot in lots:
-                free = ParkingSpot.query.filter_by(lot_id=lot.id, status='A').count()
-                lots_info.append({
-                    'id': lot.id,
-                    'prime_location_name': lot.prime_location_name,
-                    'address': lot.address,
-                    'pin_code': lot.pin_code,
-                    'price_per_hour': lot.price_per_hour,
-                    'number_of_spots': lot.number_of_spots,
-                    'available_spots': free,
-                    'utilization': round((lot.number_of_spots - free) / lot.number_of_spots * 100, 2) if lot.number_of_spots > 0 else 0
+            # Lot rows come from the per-lot fragments shared with /api/lots
+            lots = []
+            for summary in lot_summaries():
+                total, free = summary['number_of_spots'], summary['available_spots']
+                lots.append({
+                    **summary,
+                    'utilization': round((total - free) / total * 100, 2) if total > 0 else 0
                 })
             
             response_data = {
                 'message': 'Admin Dashboard',
-                'statistics': {
-                    'total_users': users_count,
-                    'total_lots': lots_count,
-                    'total_spots': spots_count,
-                    'available_spots': available,
-                    'occupied_spots': occupied,
-                    'total_reservations': reservations_count,
-                    'total_revenue': round(total_revenue, 2)
-                },
-                'recent_users': [user.to_dict() for user in recent],
-                'parking_lots': lots_info
+                'statistics': {'total_users': users['total_users'], **inventory},
+                'recent_users': users['recent_users'],
+                'parking_lots': lots
             }
             
             return jsonify(response_data), 200
@@ -69,18 +103,72 @@ def register_admin_routes(app):
             address=data['address'],
             pin_code=data['pin_code'],
             price_per_hour=data['price_per_hour'],
-            number_of_spots=data['number_of_spots']
+            number_of_spots=data['number_of_spots'],
+            available_spots=data['number_of_spots'],
+            occupied_spots=0
         )
         db.session.add(lot)
-        db.session.commit()
+        db.session.flush()
         
-        for i in range(1, lot.number_of_spots + 1):
-            spot = ParkingSpot(lot_id=lot.id, spot_number=f"A{i}", status='A')
-            db.session.add(spot)
+        # Provision the lot and its spots in one transaction with batched inserts
+        bulk_create_spots(lot.id, 1, lot.number_of_spots)
         db.session.commit()
+        spot_allocator.invalidate(lot.id)
+        suggest_index.add_lot(lot)
+        set_availability(lot.id, lot.number_of_spots)
+        invalidate_lots(lot.id, inventory=True)
         
         return jsonify({'message': 'Lot created', 'lot_id': lot.id}), 201
 
+    @app.route('/api/admin/lots/import', methods=['POST'])
+    @token_required
+    @admin_required
+    def import_lots_upload():
+        # Accept a multipart "file" upload or a raw CSV/NDJSON body; large files are handed to Celery
+        upload = request.files.get('file')
+        if upload:
+            binary, filename, content_type = upload.stream, upload.filename, upload.mimetype
+        else:
+            binary, filename, content_type = request.stream, None, request.mimetype
+        
+        fmt = detect_format(filename, content_type, request.args.get('format'))
+        if not fmt:
+            return jsonify({'message': 'Unsupported format, use csv or ndjson'}), 400
+        
+        size = request.content_length or 0
+        if request.args.get('async') in ('1', 'true') or size > current_app.config['IMPORT_ASYNC_THRESHOLD']:
+            from celery_app import import_lots_task
+            path = stage_upload(binary, fmt)
+            task = import_lots_task.delay(path, fmt)
+            return jsonify({
+                'message': 'Lot import started',
+                'task_id': task.id,
+                'status_url': f'/api/admin/lots/import/{task.id}'
+            }), 202
+        
+        summary = import_lots(text_stream(binary), fmt)
+        if summary['lots_created']:
+            cache_invalidate(*INVENTORY_NAMESPACES)
+            reset_availability()
+            suggest_index.announce_rebuild()
+        
+        status_code = 201 if summary['lots_created'] else 400
+        return jsonify({'message': 'Lot import finished', **summary}), status_code
+
+    @app.route('/api/admin/lots/import/<task_id>', methods=['GET'])
+    @token_required
+    @admin_required
+    def import_lots_status(task_id):
+        from celery_app import celery
+        
+        result = celery.AsyncResult(task_id)
+        info = result.info if isinstance(result.info, dict) else {}
+        return jsonify({
+            'task_id': task_id,
+            'state': result.state,
+            'progress': info
+        }), 200
+
     @app.route('/api/admin/lots/<int:lot_id>', methods=['PUT'])
     @token_required
     @admin_required
@@ -94,19 +182,23 @@ def register_admin_routes(app):
         lot.pin_code = data.get('pin_code', lot.pin_code)
         lot.price_per_hour = data.get('price_per_hour', lot.price_per_hour)
         new_total = data.get('number_of_spots', old_total)
+        freed = 0
         if new_total > old_total:
-            for i in range(old_total + 1, new_total + 1):
-                spot = ParkingSpot(lot_id=lot.id, spot_number=f"A{i}", status='A')
-                db.session.add(spot)
+            bulk_create_spots(lot.id, old_total + 1, new_total)
+            freed = new_total - old_total
+            adjust_lot_counters(lot.id, available=freed)
         elif new_total < old_total:
             occupied = ParkingSpot.query.filter_by(lot_id=lot.id, status='O').count()
             if occupied > new_total:
                 return jsonify({'message': 'Cannot reduce spots below occupied count'}), 400
-            extra_spots = ParkingSpot.query.filter_by(lot_id=lot.id, status='A').order_by(ParkingSpot.id.desc()).limit(old_total - new_total).all()
-            for spot in extra_spots:
-                db.session.delete(spot)
+            freed = -bulk_remove_spots(lot.id, old_total - new_total)
+            adjust_lot_counters(lot.id, available=freed)
         lot.number_of_spots = new_total
         db.session.commit()
+        spot_allocator.invalidate(lot_id)
+        suggest_index.add_lot(lot)
+        adjust_availability({lot_id: freed})
+        invalidate_lots(lot_id, inventory=True)
         
         return jsonify({'message': 'Lot updated'}), 200
 
@@ -121,6 +213,10 @@ def register_admin_routes(app):
         ParkingSpot.query.filter_by(lot_id=lot.id).delete()
         db.session.delete(lot)
         db.session.commit()
+        spot_allocator.invalidate(lot_id)
+        suggest_index.remove_lot(lot_id)
+        remove_availability(lot_id)
+        invalidate_lots(lot_id, inventory=True)
         
         return jsonify({'message': 'Lot deleted'}), 200
 
@@ -128,80 +224,79 @@ def register_admin_routes(app):
     @token_required
     @admin_required
     def admin_list_lots():
-        lots = ParkingLot.query.all()
-        result = []
-        for lot in lots:
-            total = ParkingSpot.query.filter_by(lot_id=lot.id).count()
-            available = ParkingSpot.query.filter_by(lot_id=lot.id, status='A').count()
-            occupied = ParkingSpot.query.filter_by(lot_id=lot.id, status='O').count()
-            result.append({
-                'id': lot.id,
-                'prime_location_name': lot.prime_location_name,
-                'address': lot.address,
-                'pin_code': lot.pin_code,
-                'price_per_hour': lot.price_per_hour,
-                'number_of_spots': lot.number_of_spots,
-                'available_spots': available,
-                'occupied_spots': occupied
-            })
-        return jsonify(result), 200
+        return jsonify(serialize_lots(ParkingLot.query.with_entities(*LOT_COLUMNS).all())), 200
 
     @app.route('/api/admin/lots/<int:lot_id>', methods=['GET'])
     @token_required
     @admin_required
     def lot_details(lot_id):
-        lot = ParkingLot.query.get_or_404(lot_id)
-        spots = ParkingSpot.query.filter_by(lot_id=lot.id).all()
-        spot_list = []
-        for spot in spots:
-            spot_list.append({
-                'id': spot.id,
-                'spot_number': spot.spot_number,
-                'status': spot.status
-            })
-        return jsonify({
-            'id': lot.id,
-            'prime_location_name': lot.prime_location_name,
-            'address': lot.address,
-            'pin_code': lot.pin_code,
-            'price_per_hour': lot.price_per_hour,
-            'number_of_spots': lot.number_of_spots,
-            'spots': spot_list
-        }), 200
+        lot = ParkingLot.query.with_entities(*LOT_COLUMNS).filter_by(id=lot_id).first_or_404()
+        details = serialize_lots([lot])[0]
+        spots = ParkingSpot.query.with_entities(*SPOT_COLUMNS).filter_by(lot_id=lot_id)
+        if request.args.get('status'):
+            spots = spots.filter(ParkingSpot.status == request.args['status'])
+        if wants_spot_map():
+            # Every spot of the lot as one run-length encoded map instead of a page of objects
+            rows = spots.order_by(ParkingSpot.id).yield_per(STREAM_CHUNK_SIZE)
+            return spot_map_response({**details, 'spots': encode_spots(rows)})
+        spots, next_cursor = keyset_page(spots, [ParkingSpot.id])
+        return jsonify({**details, 'spots': serialize_spots(spots), 'next_cursor': next_cursor}), 200
+
+    def serialize_listed_users(users):
+        # Current spots for the whole batch come from one query instead of one per user
+        spots = current_spots(user.id for user in users)
+        result = serialize_user_summaries(users)
+        for user in result:
+            user['current_spot'] = spots.get(user['id'])
+        return result
 
     @app.route('/api/admin/lots/<int:lot_id>/spots', methods=['GET'])
     @token_required
     @admin_required
     def admin_list_spots(lot_id):
-        spots = ParkingSpot.query.filter_by(lot_id=lot_id).all()
-        result = []
-        for spot in spots:
-            result.append({
-                'id': spot.id,
-                'spot_number': spot.spot_number,
-                'status': spot.status
-            })
-        return jsonify(result), 200
+        spots = ParkingSpot.query.with_entities(*SPOT_COLUMNS).filter_by(lot_id=lot_id)
+        if request.args.get('status'):
+            spots = spots.filter(ParkingSpot.status == request.args['status'])
+        if wants_stream():
+            return stream_collection(spots.order_by(ParkingSpot.id), serialize_spots)
+        spots, next_cursor = keyset_page(spots, [ParkingSpot.id])
+        result = serialize_spots(spots)
+        headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else {}
+        return jsonify(result), 200, headers
 
     @app.route('/api/admin/users', methods=['GET'])
     @token_required
     @admin_required
     def admin_list_users():
-        users = User.query.filter(User.role == 'user').all()
-        result = []
-        for user in users:
-            reservation = Reservation.query.filter_by(user_id=user.id).order_by(Reservation.id.desc()).first()
-            spot = None
-            if reservation and reservation.leaving_timestamp is None:
-                spot = reservation.spot_id
-            result.append({
-                'id': user.id,
-                'username': user.username,
-                'email': user.email,
-                'current_spot': spot,
-                'created_at': user.created_at.isoformat() if hasattr(user, 'created_at') and user.created_at else None
-            })
-        return jsonify(result), 200
+        users = User.query.with_entities(*USER_SUMMARY_COLUMNS).filter(User.role == 'user')
+        if wants_stream():
+            return stream_collection(users.order_by(User.id), serialize_listed_users)
+        users, next_cursor = keyset_page(users, [User.id])
+        result = serialize_listed_users(users)
+        headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else {}
+        return jsonify(result), 200, headers
+
+    @app.route('/api/admin/users/<int:user_id>/fleet', methods=['PUT'])
+    @token_required
+    @admin_required
+    def admin_set_fleet(user_id):
+        # Fleet accounts may hold several active reservations through /api/reserve/batch
+        data = request.get_json() or {}
+        if not isinstance(data.get('fleet'), bool):
+            return jsonify({'message': 'fleet must be true or false'}), 400
+        
+        user = User.query.get_or_404(user_id)
+        user.fleet = data['fleet']
+        db.session.commit()
+        cache_invalidate("api:users")
+        return jsonify({'message': 'Fleet access updated', 'user': user.to_dict()}), 200
+
+    @app.route('/api/admin/cache/stats', methods=['GET'])
+    @token_required
+    @admin_required
+    def admin_cache_stats():
+        # Hit/miss counters of this worker's local and Redis cache tiers and of its verified-token cache
+        return jsonify({**cache_stats(), 'auth': token_cache_stats()}), 200
 
     @app.route('/api/admin/search', methods=['GET'])
     @token_required
@@ -219,62 +314,31 @@ def register_admin_routes(app):
             'spots': []
         }
         
-        query_lower = query.lower()
+        # Each section is a ranked full-text lookup capped at `limit`, then one query to load the rows
+        limit = clamp_limit(request.args.get('limit', type=int))
         
         if search_type in ['all', 'lots']:
-            lots = ParkingLot.query.all()
-            for lot in lots:
-                if (lot.prime_location_name and query_lower in lot.prime_location_name.lower()) or \
-                   (lot.address and query_lower in lot.address.lower()) or \
-                   (lot.pin_code and query in lot.pin_code):
-                    
-                    total = ParkingSpot.query.filter_by(lot_id=lot.id).count()
-                    available = ParkingSpot.query.filter_by(lot_id=lot.id, status='A').count()
-                    occupied = ParkingSpot.query.filter_by(lot_id=lot.id, status='O').count()
-                    
-                    results['lots'].append({
-                        'id': lot.id,
-                        'prime_location_name': lot.prime_location_name,
-                        'address': lot.address,
-                        'pin_code': lot.pin_code,
-                        'price_per_hour': lot.price_per_hour,
-                        'number_of_spots': lot.number_of_spots,
-                        'available_spots': available,
-                        'occupied_spots': occupied
-                    })
+            lot_ids = search_lot_ids(query, limit)
+            rows = ParkingLot.query.with_entities(*LOT_COLUMNS).filter(ParkingLot.id.in_(lot_ids)).all()
+            lots = {lot['id']: lot for lot in serialize_lots(rows)}
+            results['lots'] = [lots[lot_id] for lot_id in lot_ids]
         
         if search_type in ['all', 'users']:
-            users = User.query.filter(User.role == 'user').all()
-            for user in users:
-                if query_lower in user.username.lower() or \
-                   query_lower in user.email.lower() or \
-                   query in str(user.id):
-                    
-                    reservation = Reservation.query.filter_by(user_id=user.id).order_by(Reservation.id.desc()).first()
-                    spot = None
-                    if reservation and reservation.leaving_timestamp is None:
-                        spot = reservation.spot_id
-                    
-                    results['users'].append({
-                        'id': user.id,
-                        'username': user.username,
-                        'email': user.email,
-                        'current_spot': spot,
-                        'created_at': user.created_at.isoformat() if hasattr(user, 'created_at') and user.created_at else None
-                    })
+            user_ids = search_user_ids(query, limit)
+            rows = User.query.with_entities(*USER_SUMMARY_COLUMNS).filter(User.id.in_(user_ids)).all()
+            users = {user['id']: user for user in serialize_listed_users(rows)}
+            results['users'] = [users[user_id] for user_id in user_ids]
         
         if search_type in ['all', 'spots']:
-            spots = ParkingSpot.query.all()
-            for spot in spots:
-                if query_lower in spot.spot_number.lower() or query in str(spot.id):
-                    lot = db.session.get(ParkingLot, spot.lot_id)
-                    results['spots'].append({
-                        'id': spot.id,
-                        'spot_number': spot.spot_number,
-                        'status': spot.status,
-                        'lot_id': spot.lot_id,
-                        'lot_name': lot.prime_location_name if lot else 'Unknown'
-                    })
+            spot_ids = search_spot_ids(query, limit)
+            # Outer join: a spot whose lot row is gone is still listed, under an 'Unknown' lot
+            rows = db.session.query(*LOT_SPOT_COLUMNS).outerjoin(ParkingLot, ParkingLot.id == ParkingSpot.lot_id) \
+                .filter(ParkingSpot.id.in_(spot_ids)).all()
+            spots = {spot['id']: spot for spot in serialize_lot_spots(rows)}
+            for spot in spots.values():
+                if spot['lot_name'] is None:
+                    spot['lot_name'] = 'Unknown'
+            results['spots'] = [spots[spot_id] for spot_id in spot_ids]
         
         return jsonify(results), 200
 
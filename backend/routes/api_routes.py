@@ -1,7 +1,22 @@
-from flask import jsonify, request
+from flask import Response, jsonify, request, current_app
+from sqlalchemy.orm import joinedload
 from models import db, User, ParkingLot, ParkingSpot, Reservation
-from auth import token_required, admin_required, user_required
-from cache import cache_get, cache_set, cache_delete, cache_clear_pattern, cache_key
+from auth import token_required, query_token_required, admin_required, user_required
+from cache import cache_fetch, cache_key, versioned_key
+from lot_cache import invalidate_lots, lot_namespace, lot_summaries, spot_page_namespace, spot_page_tags, SPOT_STATUS_NAMESPACE
+from availability import adjust_availability, AVAILABILITY_NAMESPACE
+from conditional import conditional_get
+from availability_stream import availability_events, SSE_MIMETYPE
+from allocator import spot_allocator
+from reservations import claim_spot, close_reservation, release_claimed_spot, calculate_parking_cost
+from inventory import adjust_lot_counters
+from search import search_lot_ids, clamp_limit
+from pagination import keyset_page, page_limit, InvalidCursor, NEXT_CURSOR_HEADER
+from streaming import stream_collection, wants_stream
+from spot_map import encode_lots, spot_map_response, wants_spot_map
+from serializers import (LOT_SPOT_COLUMNS, LOT_SUMMARY_COLUMNS, USER_COLUMNS, serialize_lot_spots,
+                         serialize_lot_summaries, serialize_users)
+from suggest import suggest_index, DEFAULT_SUGGESTIONS, MAX_SUGGESTIONS
 from datetime import datetime
 
 def register_api_routes(app):
@@ -11,68 +26,84 @@ def register_api_routes(app):
     @token_required
     @admin_required
     def get_all_users():
-        # Retrieve list of all registered users (admin only)
-        users = User.query.all()
-        return jsonify([user.to_dict() for user in users]), 200
+        # Retrieve registered users (admin only), one keyset page at a time, optionally filtered by ?role=
+        users = User.query.with_entities(*USER_COLUMNS)
+        if request.args.get('role'):
+            users = users.filter(User.role == request.args['role'])
+        if wants_stream():
+            return stream_collection(users.order_by(User.id), serialize_users)
+        users, next_cursor = keyset_page(users, [User.id])
+        headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else {}
+        return jsonify(serialize_users(users)), 200, headers
 
     @app.route('/api/lots')
     @token_required
+    @conditional_get(("api:lots", AVAILABILITY_NAMESPACE))
     def get_lots():
-        # Fetch all parking lots with availability information, using Redis cache for performance
-        cache_key_name = cache_key("api", "lots")
-        cached_result = cache_get(cache_key_name)
-        if cached_result:
-            return jsonify(cached_result), 200
-        
-        lots = ParkingLot.query.all()
-        result = []
-        for lot in lots:
-            free = ParkingSpot.query.filter_by(lot_id=lot.id, status='A').count()
-            result.append({
-                'id': lot.id,
-                'prime_location_name': lot.prime_location_name,
-                'address': lot.address,
-                'pin_code': lot.pin_code,
-                'price_per_hour': lot.price_per_hour,
-                'number_of_spots': lot.number_of_spots,
-                'available_spots': free
-            })
-        
-        # Store result in cache with 60 second expiration
-        cache_set(cache_key_name, result, 60)
-        return jsonify(result), 200
+        # Fetch all parking lots with availability information, assembled from per-lot cache fragments
+        # so a booking only forces the affected lot to be re-read
+        return jsonify(lot_summaries()), 200
+
+    def spot_listing_namespaces():
+        # A single lot's spots change with that lot; any other listing with any booking
+        lot_id = request.args.get('lot_id', type=int)
+        return ("api:spots", lot_namespace(lot_id) if lot_id else SPOT_STATUS_NAMESPACE)
 
     @app.route('/api/spots')
     @token_required
+    @conditional_get(spot_listing_namespaces)
     def get_spots():
-        # Retrieve all parking spots with their current status and associated lot information
+        # Retrieve parking spots with their current status and associated lot information, one keyset page at a time
         try:
-            # Check Redis cache before querying database
-            cache_key_name = cache_key("api", "spots")
-            cached_result = cache_get(cache_key_name)
-            if cached_result:
-                return jsonify(cached_result), 200
+            lot_id = request.args.get('lot_id', type=int)
+            status = request.args.get('status')
+            cursor = request.args.get('cursor', '')
+            limit = page_limit()
+            
+            # Lot name and address come from the join, not a lookup per spot
+            spots = db.session.query(*LOT_SPOT_COLUMNS).join(ParkingLot, ParkingLot.id == ParkingSpot.lot_id)
+            if lot_id:
+                spots = spots.filter(ParkingSpot.lot_id == lot_id)
+            if status:
+                spots = spots.filter(ParkingSpot.status == status)
+            namespace = spot_page_namespace(lot_id, status)
+            if wants_spot_map():
+                # The whole filtered collection, one run-length encoded entry per lot, cached like a page
+                map_args = ("map", lot_id or '', status or '')
+                spot_map = cache_fetch(versioned_key(namespace, *map_args),
+                                       lambda: {'lots': encode_lots(spots.order_by(ParkingSpot.id))}, 30,
+                                       stale_key=cache_key(namespace, "stale", *map_args), tags=spot_page_tags(lot_id))
+                return spot_map_response(spot_map)
+            if wants_stream():
+                return stream_collection(spots.order_by(ParkingSpot.id), serialize_lot_spots)
             
-            spots = ParkingSpot.query.join(ParkingLot).all()
-            result = []
-            for spot in spots:
-                lot = db.session.get(ParkingLot, spot.lot_id)
-                result.append({
-                    'id': spot.id,
-                    'lot_id': spot.lot_id,
-                    'spot_number': spot.spot_number,
-                    'status': spot.status,
-                    'lot_name': lot.prime_location_name if lot else 'Unknown',
-                    'lot_address': lot.address if lot else 'Unknown'
-                })
+            def build():
+                rows, next_cursor = keyset_page(spots, [ParkingSpot.id], cursor=cursor, limit=limit)
+                return {'spots': serialize_lot_spots(rows), 'next_cursor': next_cursor}
             
-            # Cache result for 30 seconds since spot status changes frequently
-            cache_set(cache_key_name, result, 30)
-            return jsonify(result), 200
+            # Each page of each filter is cached for 30 seconds and tagged with its lots, so a booking
+            # only retires pages showing that lot; concurrent misses rebuild once
+            page_args = (lot_id or '', status or '', cursor, limit)
+            page = cache_fetch(versioned_key(namespace, *page_args), build, 30,
+                               stale_key=cache_key(namespace, "stale", *page_args), tags=spot_page_tags(lot_id))
+            headers = {NEXT_CURSOR_HEADER: page['next_cursor']} if page['next_cursor'] else {}
+            return jsonify(page['spots']), 200, headers
+        except InvalidCursor:
+            raise
         except Exception as e:
             print(f"Error in get_spots: {e}")
             return jsonify({'error': 'Failed to fetch spots', 'message': str(e)}), 500
 
+    @app.route('/api/stream/availability')
+    @query_token_required
+    def stream_availability():
+        # Server-sent events: a snapshot of free spots per lot, then every committed change as it happens
+        # The generator runs outside the request context and opens a short app context per snapshot
+        events = availability_events(current_app._get_current_object(), until=request.token_expires)
+        return Response(events,
+                        mimetype=SSE_MIMETYPE,
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
     @app.route('/api/status')
     @token_required
     @admin_required
@@ -96,16 +127,22 @@ def register_api_routes(app):
         lot_id = data.get('lot_id')
         if not lot_id:
             return jsonify({'message': 'Missing lot_id'}), 400
+        try:
+            lot_id = int(lot_id)
+        except (TypeError, ValueError):
+            return jsonify({'message': 'Invalid lot_id'}), 400
         
         # Ensure user doesn't have an existing active reservation
         active_res = Reservation.query.filter_by(user_id=request.user_id, leaving_timestamp=None).first()
         if active_res:
             return jsonify({'message': 'You already have an active reservation'}), 400
         
-        # Find first available spot in the requested lot
-        spot = ParkingSpot.query.filter_by(lot_id=lot_id, status='A').first()
-        if not spot:
+        # Atomically claim a free spot (conditional UPDATE with bounded retry)
+        spot_id = claim_spot(lot_id)
+        if spot_id is None:
+            db.session.rollback()
             return jsonify({'message': 'No available spots in this lot'}), 400
+        spot = db.session.get(ParkingSpot, spot_id)
         
         # Create new reservation record
         reservation = Reservation(
@@ -113,7 +150,6 @@ def register_api_routes(app):
             spot_id=spot.id, 
             parking_timestamp=datetime.utcnow()
         )
-        spot.status = 'O'  # Mark spot as occupied
         
         # Update user's last visit timestamp
         user = db.session.get(User, request.user_id)
@@ -121,11 +157,16 @@ def register_api_routes(app):
             user.last_visit = datetime.utcnow()
         
         db.session.add(reservation)
-        db.session.commit()
+        try:
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            spot_allocator.release(lot_id, spot.id)
+            raise
         
-        # Invalidate cached data since spot availability has changed
-        cache_clear_pattern("api:spots*")
-        cache_clear_pattern("api:lots*")
+        # Invalidate cached data of this lot only since its availability has changed
+        adjust_availability({lot_id: -1})
+        invalidate_lots(lot_id)
         
         return jsonify({
             'message': 'Parking spot allocated successfully',
@@ -148,31 +189,36 @@ def register_api_routes(app):
         if not reservation_id:
             return jsonify({'message': 'Missing reservation_id'}), 400
         
-        # Locate the active reservation for this user
-        reservation = Reservation.query.filter_by(id=reservation_id, user_id=request.user_id, leaving_timestamp=None).first()
+        # Locate the active reservation for this user, with its spot and lot in the same query
+        reservation = Reservation.query.options(joinedload(Reservation.spot).joinedload(ParkingSpot.lot)) \
+            .filter_by(id=reservation_id, user_id=request.user_id, leaving_timestamp=None).first()
         if not reservation:
             return jsonify({'message': 'Active reservation not found'}), 404
         
         # Record departure time and calculate parking duration
-        reservation.leaving_timestamp = datetime.utcnow()
-        spot = db.session.get(ParkingSpot, reservation.spot_id)
-        lot = db.session.get(ParkingLot, spot.lot_id)
+        leaving_timestamp = datetime.utcnow()
+        spot = reservation.spot
+        lot = spot.lot
+        # Plain values, so nothing has to be reloaded once the commit expires the objects
+        lot_id, spot_id = spot.lot_id, spot.id
         
-        # Calculate duration in hours (minimum 1 hour charge)
-        duration_hours = (reservation.leaving_timestamp - reservation.parking_timestamp).total_seconds() / 3600
-        if duration_hours < 1:
-            duration_hours = 1
+        # Compute total cost from duration (minimum 1 hour charge) and lot's hourly rate
+        calculated_cost, duration_hours = calculate_parking_cost(
+            reservation.parking_timestamp, leaving_timestamp, lot.price_per_hour)
         
-        # Compute total cost based on duration and lot's hourly rate
-        calculated_cost = round(duration_hours * lot.price_per_hour, 2)
-        reservation.parking_cost = calculated_cost
-        spot.status = 'A'  # Mark spot as available again
+        # Close the session only if a concurrent request has not already done so
+        if not close_reservation(reservation.id, leaving_timestamp, calculated_cost):
+            db.session.rollback()
+            return jsonify({'message': 'Active reservation not found'}), 404
+        freed = release_claimed_spot(lot_id, spot_id)  # Mark spot as available again
         
         db.session.commit()
+        spot_allocator.release(lot_id, spot_id)
         
-        # Clear cached data to reflect updated spot availability
-        cache_clear_pattern("api:spots*")
-        cache_clear_pattern("api:lots*")
+        # Clear this lot's cached data to reflect updated spot availability
+        if freed:
+            adjust_availability({lot_id: 1})
+        invalidate_lots(lot_id)
         
         return jsonify({
             'message': 'Parking session completed successfully', 
@@ -180,6 +226,181 @@ def register_api_routes(app):
             'duration_hours': round(duration_hours, 2)
         }), 200
 
+    @app.route('/api/reserve/batch', methods=['POST'])
+    @token_required
+    @user_required
+    def reserve_spots_batch():
+        # Allocate several spots in one transaction for fleet operators; each item is {"lot_id": ...}.
+        # Fleets hold many sessions at once, so the one-active-reservation rule of /api/reserve does not apply
+        # to them; every other account keeps that rule and has to use /api/reserve.
+        user = db.session.get(User, request.user_id)
+        if not user or not user.fleet:
+            return jsonify({'message': 'Batch reservations are only available to fleet accounts'}), 403
+        
+        data = request.get_json() or {}
+        items = data.get('items')
+        if not isinstance(items, list) or not items:
+            return jsonify({'message': 'Missing items'}), 400
+        max_batch = current_app.config['MAX_BATCH_SIZE']
+        if len(items) > max_batch:
+            return jsonify({'message': f'At most {max_batch} items per batch'}), 400
+        
+        now = datetime.utcnow()
+        results = []
+        claimed = []  # (result, lot_id, spot_id) for successfully claimed spots
+        lot_deltas = {}
+        for index, item in enumerate(items):
+            try:
+                lot_id = int(item.get('lot_id'))
+            except (AttributeError, TypeError, ValueError):
+                results.append({'index': index, 'status': 'failed', 'message': 'Invalid lot_id'})
+                continue
+            
+            spot_id = claim_spot(lot_id, update_counters=False)
+            if spot_id is None:
+                results.append({'index': index, 'lot_id': lot_id, 'status': 'failed',
+                                'message': 'No available spots in this lot'})
+                continue
+            
+            result = {'index': index, 'lot_id': lot_id, 'status': 'reserved'}
+            results.append(result)
+            claimed.append((result, lot_id, spot_id))
+            lot_deltas[lot_id] = lot_deltas.get(lot_id, 0) + 1
+        
+        if not claimed:
+            db.session.rollback()
+            return jsonify({'message': 'No spots could be allocated', 'reserved': 0,
+                            'failed': len(results), 'results': results}), 400
+        
+        # One counter update per lot rather than per spot
+        for lot_id, count in lot_deltas.items():
+            adjust_lot_counters(lot_id, available=-count, occupied=count)
+        
+        reservations = [Reservation(user_id=request.user_id, spot_id=spot_id, parking_timestamp=now)
+                        for _, _, spot_id in claimed]
+        db.session.add_all(reservations)
+        user.last_visit = now
+        
+        try:
+            # Flush for the ids before commit expires the objects, which would reload each one
+            db.session.flush()
+            reservation_ids = [reservation.id for reservation in reservations]
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            for _, lot_id, spot_id in claimed:
+                spot_allocator.release(lot_id, spot_id)
+            raise
+        
+        spot_numbers = dict(ParkingSpot.query.with_entities(ParkingSpot.id, ParkingSpot.spot_number)
+                            .filter(ParkingSpot.id.in_([spot_id for _, _, spot_id in claimed])).all())
+        for (result, _, spot_id), reservation_id in zip(claimed, reservation_ids):
+            result['reservation'] = {
+                'id': reservation_id,
+                'spot_id': spot_id,
+                'spot_number': spot_numbers.get(spot_id),
+                'parking_timestamp': now.isoformat(),
+                'parking_cost': 0.0
+            }
+        
+        # A single availability update and invalidation cover every lot touched by the batch
+        adjust_availability({lot_id: -count for lot_id, count in lot_deltas.items()})
+        invalidate_lots(*lot_deltas)
+        
+        return jsonify({
+            'message': 'Batch reservation processed',
+            'reserved': len(claimed),
+            'failed': len(results) - len(claimed),
+            'results': results
+        }), 201
+
+    @app.route('/api/release/batch', methods=['POST'])
+    @token_required
+    @user_required
+    def release_spots_batch():
+        # Complete several parking sessions in one transaction
+        data = request.get_json() or {}
+        reservation_ids = data.get('reservation_ids')
+        if not isinstance(reservation_ids, list) or not reservation_ids:
+            return jsonify({'message': 'Missing reservation_ids'}), 400
+        max_batch = current_app.config['MAX_BATCH_SIZE']
+        if len(reservation_ids) > max_batch:
+            return jsonify({'message': f'At most {max_batch} reservation_ids per batch'}), 400
+        
+        parsed_ids = []
+        for reservation_id in reservation_ids:
+            try:
+                parsed_ids.append(int(reservation_id))
+            except (TypeError, ValueError):
+                parsed_ids.append(None)
+        
+        # Load every requested active session with its spot and lot rate in one query
+        rows = db.session.query(Reservation.id, Reservation.spot_id, Reservation.parking_timestamp,
+                                ParkingSpot.lot_id, ParkingLot.price_per_hour) \
+            .join(ParkingSpot, ParkingSpot.id == Reservation.spot_id) \
+            .join(ParkingLot, ParkingLot.id == ParkingSpot.lot_id) \
+            .filter(Reservation.id.in_([rid for rid in parsed_ids if rid is not None]),
+                    Reservation.user_id == request.user_id,
+                    Reservation.leaving_timestamp.is_(None)).all()
+        active = {row.id: row for row in rows}
+        
+        leaving_timestamp = datetime.utcnow()
+        results = []
+        released = []  # (lot_id, spot_id) freed in this transaction
+        lot_deltas = {}
+        for index, reservation_id in enumerate(parsed_ids):
+            row = active.pop(reservation_id, None)
+            if row is None:
+                results.append({'index': index, 'reservation_id': reservation_ids[index], 'status': 'failed',
+                                'message': 'Active reservation not found'})
+                continue
+            
+            calculated_cost, duration_hours = calculate_parking_cost(
+                row.parking_timestamp, leaving_timestamp, row.price_per_hour)
+            if not close_reservation(row.id, leaving_timestamp, calculated_cost):
+                results.append({'index': index, 'reservation_id': reservation_id, 'status': 'failed',
+                                'message': 'Active reservation not found'})
+                continue
+            if release_claimed_spot(row.lot_id, row.spot_id, update_counters=False):
+                released.append((row.lot_id, row.spot_id))
+                lot_deltas[row.lot_id] = lot_deltas.get(row.lot_id, 0) + 1
+            
+            results.append({'index': index, 'reservation_id': reservation_id, 'status': 'released',
+                            'parking_cost': calculated_cost, 'duration_hours': round(duration_hours, 2)})
+        
+        for lot_id, count in lot_deltas.items():
+            adjust_lot_counters(lot_id, available=count, occupied=-count)
+        db.session.commit()
+        
+        for lot_id, spot_id in released:
+            spot_allocator.release(lot_id, spot_id)
+        
+        released_count = sum(1 for result in results if result['status'] == 'released')
+        if released_count:
+            adjust_availability(lot_deltas)
+            invalidate_lots(*lot_deltas)
+        
+        return jsonify({
+            'message': 'Batch release processed',
+            'released': released_count,
+            'failed': len(results) - released_count,
+            'total_cost': round(sum(result.get('parking_cost', 0) for result in results), 2),
+            'results': results
+        }), 200 if released_count else 404
+
+    @app.route('/api/search/suggest', methods=['GET'])
+    @token_required
+    def search_suggest():
+        # Type-ahead completions for lot names, areas and pin codes, served from memory
+        query = request.args.get('q', '').strip()
+        limit = request.args.get('limit', DEFAULT_SUGGESTIONS, type=int)
+        limit = max(1, min(limit, MAX_SUGGESTIONS))
+        
+        return jsonify({
+            'query': query,
+            'suggestions': suggest_index.suggest(query, limit)
+        }), 200
+
     @app.route('/api/search', methods=['GET'])
     @token_required
     def search_parking():
@@ -190,30 +411,12 @@ def register_api_routes(app):
         if not query:
             return jsonify({'message': 'Search query is required'}), 400
         
-        query_lower = query.lower()
-        lots = ParkingLot.query.all()
-        results = []
-        
-        # Filter lots matching search criteria
-        for lot in lots:
-            if (lot.prime_location_name and query_lower in lot.prime_location_name.lower()) or \
-               (lot.address and query_lower in lot.address.lower()) or \
-               (lot.pin_code and query in lot.pin_code):
-                
-                available_spots = ParkingSpot.query.filter_by(lot_id=lot.id, status='A').count()
-                # Skip lots with no available spots if filtering for availability
-                if search_type == 'available' and available_spots == 0:
-                    continue
-                
-                results.append({
-                    'id': lot.id,
-                    'prime_location_name': lot.prime_location_name,
-                    'address': lot.address,
-                    'pin_code': lot.pin_code,
-                    'price_per_hour': lot.price_per_hour,
-                    'number_of_spots': lot.number_of_spots,
-                    'available_spots': available_spots
-                })
+        # Ranked full-text match; lots with no free spots are dropped in SQL when filtering for availability
+        lot_ids = search_lot_ids(query, clamp_limit(request.args.get('limit', type=int)),
+                                 available_only=search_type == 'available')
+        rows = ParkingLot.query.with_entities(*LOT_SUMMARY_COLUMNS).filter(ParkingLot.id.in_(lot_ids)).all()
+        lots = {lot['id']: lot for lot in serialize_lot_summaries(rows)}
+        results = [lots[lot_id] for lot_id in lot_ids]
         
         return jsonify({
             'query': query,
@@ -1,6 +1,25 @@
-from flask import jsonify, request
+from flask import current_app, jsonify, request
 from models import db, User
-from auth import generate_token, token_required
+from auth import generate_token, token_required, revoke_token
+from cache import cache_invalidate
+from password_hashing import HashingBusy
+
+HASHING_RETRY_AFTER = 1  # Seconds a client should wait when the bcrypt queue is full
+
+def _hashing_busy():
+    response = jsonify({'message': 'Too many sign-ins right now, please retry shortly'})
+    response.headers['Retry-After'] = str(HASHING_RETRY_AFTER)
+    return response, 503
+
+def _upgrade_password_hash(user, password):
+    # The password was just verified, so a hash at an outdated cost can be replaced with it
+    if not user.password_needs_rehash():
+        return
+    try:
+        user.set_password(password)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()  # The old hash still works; the next login tries again
 
 def register_auth_routes(app):
     
@@ -25,11 +44,15 @@ def register_auth_routes(app):
             pincode=data['pincode'],
             role='user'
         )
-        user.set_password(data['password'])
+        try:
+            user.set_password(data['password'])
+        except HashingBusy:
+            return _hashing_busy()
         
         try:
             db.session.add(user)
             db.session.commit()
+            cache_invalidate("api:users")  # Admin dashboard user totals and recent sign-ups
             token = generate_token(user.id, user.username, user.role)
             return jsonify({
                 'message': 'User registered successfully',
@@ -50,8 +73,12 @@ def register_auth_routes(app):
         
         user = User.query.filter_by(username=data['username']).first()
         
-        if not user or not user.check_password(data['password']):
-            return jsonify({'message': 'Invalid username or password'}), 401
+        try:
+            if not user or not user.check_password(data['password']):
+                return jsonify({'message': 'Invalid username or password'}), 401
+        except HashingBusy:
+            return _hashing_busy()
+        _upgrade_password_hash(user, data['password'])
         
         token = generate_token(user.id, user.username, user.role)
         redirect_url = '/admin/dashboard' if user.role == 'admin' else '/user/dashboard'
@@ -72,8 +99,12 @@ def register_auth_routes(app):
         
         user = User.query.filter_by(username=data['username'], role='admin').first()
         
-        if not user or not user.check_password(data['password']):
-            return jsonify({'message': 'Invalid admin credentials'}), 401
+        try:
+            if not user or not user.check_password(data['password']):
+                return jsonify({'message': 'Invalid admin credentials'}), 401
+        except HashingBusy:
+            return _hashing_busy()
+        _upgrade_password_hash(user, data['password'])
         
         token = generate_token(user.id, user.username, user.role)
         return jsonify({
@@ -86,6 +117,18 @@ def register_auth_routes(app):
     @app.route('/auth/logout', methods=['POST'])
     @token_required
     def logout():
+        # Stateless tokens stay valid until exp unless revoked here
+        try:
+            revoke_token(request.token, request.token_expires)
+        except Exception as e:
+            # The client drops its token either way; only the server-side revocation is missing
+            current_app.logger.warning(f"Token revocation failed: {e}")
+            return jsonify({
+                'message': 'Logged out successfully',
+                'note': 'The token could not be revoked on the server and stays valid until it expires',
+                'redirect': '/'
+            }), 200
+        
         return jsonify({
             'message': 'Logged out successfully',
             'redirect': '/'
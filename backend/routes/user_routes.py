@@ -1,80 +1,53 @@
 from flask import jsonify, request
-from models import db, User, ParkingLot, ParkingSpot, Reservation
+from models import db, User, ParkingSpot, Reservation
 from auth import token_required, user_required
+from pagination import keyset_page
+from serializers import RESERVATION_COLUMNS, serialize_reservations
+from lot_cache import lot_summaries
+from availability import AVAILABILITY_NAMESPACE
+from conditional import conditional_get
 
 def register_user_routes(app):
     
-    def serialize_reservation(reservation):
-        spot = db.session.get(ParkingSpot, reservation.spot_id)
-        lot_id = spot.lot_id if spot else None
+    def user_reservations():
+        # Column rows joined with the spot for its lot id: no ORM objects for a read-only listing.
+        # Outer join so history survives a deleted lot (its reservations get lot_id None)
+        return db.session.query(*RESERVATION_COLUMNS) \
+            .outerjoin(ParkingSpot, ParkingSpot.id == Reservation.spot_id) \
+            .filter(Reservation.user_id == request.user_id)
+    
+    def dashboard():
+        reservations = user_reservations().order_by(Reservation.parking_timestamp.desc()).limit(5).all()
+        user = db.session.get(User, request.user_id)
         return {
-            'id': reservation.id,
-            'spot_id': reservation.spot_id,
-            'lot_id': lot_id,
-            'parking_timestamp': reservation.parking_timestamp.isoformat() if reservation.parking_timestamp else None,
-            'leaving_timestamp': reservation.leaving_timestamp.isoformat() if reservation.leaving_timestamp else None,
-            'parking_cost': reservation.parking_cost,
-            'status': 'active' if not reservation.leaving_timestamp else 'completed'
+            'message': 'User Dashboard',
+            'user': user.to_dict(),
+            'my_reservations': serialize_reservations(reservations),
+            # The cached lot listing with live free counts, shared with /api/lots
+            'available_parking_lots': lot_summaries()
         }
     
+    # The lot list changes with the inventory and the free counts, the caller's own
+    # reservations only through bookings, which also move the free counts, and the
+    # account itself through admin user changes (e.g. the fleet flag), which bump api:users
+    USER_DASHBOARD_NAMESPACES = ("api:lots", "api:users", AVAILABILITY_NAMESPACE)
+
     @app.route('/user/dashboard')
     @token_required
     @user_required
+    @conditional_get(USER_DASHBOARD_NAMESPACES)
     def user_dashboard_page():
         try:
-            reservations = Reservation.query.filter_by(user_id=request.user_id).order_by(Reservation.parking_timestamp.desc()).limit(5).all()
-            
-            lots = ParkingLot.query.all()
-            lots_info = []
-            for lot in lots:
-                free = ParkingSpot.query.filter_by(lot_id=lot.id, status='A').count()
-                lots_info.append({
-                    'id': lot.id,
-                    'prime_location_name': lot.prime_location_name,
-                    'address': lot.address,
-                    'pin_code': lot.pin_code,
-                    'price_per_hour': lot.price_per_hour,
-                    'available_spots': free
-                })
-            
-            user = db.session.get(User, request.user_id)
-            
-            return jsonify({
-                'message': 'User Dashboard',
-                'user': user.to_dict(),
-                'my_reservations': [serialize_reservation(res) for res in reservations],
-                'available_parking_lots': lots_info
-            }), 200
+            return jsonify(dashboard()), 200
         except Exception as e:
             return jsonify({'error': 'Failed to load user dashboard', 'message': str(e)}), 500
 
     @app.route('/api/user/dashboard')
     @token_required
     @user_required
+    @conditional_get(USER_DASHBOARD_NAMESPACES)
     def api_user_dashboard():
-        reservations = Reservation.query.filter_by(user_id=request.user_id).order_by(Reservation.parking_timestamp.desc()).limit(5).all()
-        
-        lots = ParkingLot.query.all()
-        lots_info = []
-        for lot in lots:
-            free = ParkingSpot.query.filter_by(lot_id=lot.id, status='A').count()
-            lots_info.append({
-                'id': lot.id,
-                'prime_location_name': lot.prime_location_name,
-                'address': lot.address,
-                'pin_code': lot.pin_code,
-                'price_per_hour': lot.price_per_hour,
-                'available_spots': free
-            })
-        
-        user = db.session.get(User, request.user_id)
-        
-        return jsonify({
-            'message': 'User Dashboard',
-            'user': user.to_dict(),
-            'my_reservations': [serialize_reservation(res) for res in reservations],
-            'available_parking_lots': lots_info
-        }), 200
+        return jsonify(dashboard()), 200
 
     @app.route('/api/user/profile')
     @token_required
@@ -89,8 +62,17 @@ def register_user_routes(app):
     @token_required
     @user_required
     def get_user_reservations():
-        reservations = Reservation.query.filter_by(user_id=request.user_id).order_by(Reservation.parking_timestamp.desc()).all()
+        # Newest first, one keyset page at a time; ?status=active|completed narrows the listing
+        reservations = user_reservations()
+        status = request.args.get('status')
+        if status == 'active':
+            reservations = reservations.filter(Reservation.leaving_timestamp.is_(None))
+        elif status == 'completed':
+            reservations = reservations.filter(Reservation.leaving_timestamp.isnot(None))
+        reservations, next_cursor = keyset_page(
+            reservations, [Reservation.parking_timestamp, Reservation.id], descending=True)
         
         return jsonify({
-            'reservations': [serialize_reservation(res) for res in reservations]
+            'reservations': serialize_reservations(reservations),
+            'next_cursor': next_cursor
         }), 200
\ No newline at end of file
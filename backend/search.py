@@ -0,0 +1,202 @@
+"""
+Ranked full-text search over lots, users and spots.
+
+On SQLite this queries the FTS5 tables (lot_search, user_search,
+spot_search) created by the search-index migration; on Postgres it uses the
+GIN-indexed to_tsvector('simple', ...) expressions from the same migration.
+Every table is matched by substring ("15" finds spot "A15", "oad" finds
+"MG Road") through the trigram indexes of the substring-search migration;
+where those are missing (SQLite before 3.34) query words match as prefixes.
+Results are ranked (bm25 / ts_rank) and capped with LIMIT. Databases without
+any index (e.g. built with db.create_all()) fall back to ILIKE matching so
+search keeps working.
+
+Each function returns model ids in rank order; callers hydrate the rows.
+"""
+import re
+
+from sqlalchemy import text, or_
+
+from models import db, User, ParkingLot, ParkingSpot
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
+# Must match the expressions indexed by the search-index migration
+POSTGRES_VECTORS = {
+    'parking_lot': "to_tsvector('simple', coalesce(prime_location_name, '') || ' ' || coalesce(address, '') || ' ' || coalesce(pin_code, ''))",
+    'user': "to_tsvector('simple', coalesce(username, '') || ' ' || coalesce(email, ''))",
+    'parking_spot': "to_tsvector('simple', coalesce(spot_number, ''))",
+}
+
+# Must match the substring-search migration: (fts table, columns) on SQLite, the pg_trgm expression on Postgres
+SUBSTRING_INDEXES = {
+    'parking_lot': ('lot_search', ('prime_location_name', 'address', 'pin_code'),
+                    "lower(coalesce(b.prime_location_name, '') || ' ' || coalesce(b.address, '') || ' ' "
+                    "|| coalesce(b.pin_code, ''))"),
+    'user': ('user_search', ('username', 'email'),
+             "lower(coalesce(b.username, '') || ' ' || coalesce(b.email, ''))"),
+    'parking_spot': ('spot_search', ('spot_number',), "lower(coalesce(b.spot_number, ''))"),
+}
+TRIGRAM_LENGTH = 3  # Shortest term a trigram index can look up
+
+_backends = {}
+
+
+def clamp_limit(limit):
+    """Bound a user-supplied result limit to 1..MAX_LIMIT"""
+    if not limit:
+        return DEFAULT_LIMIT
+    return max(1, min(int(limit), MAX_LIMIT))
+
+
+def _terms(query):
+    return re.findall(r'\w+', query.lower())
+
+
+def _backend():
+    # 'fts5', 'tsvector' or 'like', detected once per database
+    engine = db.engine
+    key = str(engine.url)
+    if key not in _backends:
+        backend = 'like'
+        with engine.connect() as conn:
+            if engine.dialect.name == 'sqlite':
+                found = conn.execute(text(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'lot_search'")).first()
+                backend = 'fts5' if found else 'like'
+            elif engine.dialect.name == 'postgresql':
+                # The substring-search migration replaces the word index
+                found = conn.execute(text(
+                    "SELECT 1 FROM pg_indexes WHERE indexname IN "
+                    "('ix_parking_lot_search', 'ix_parking_lot_substring')")).first()
+                backend = 'tsvector' if found else 'like'
+        _backends[key] = backend
+    return _backends[key]
+
+
+def _substring_backend():
+    # 'trigram', 'pg_trgm' or None when only the word index exists, detected once per database
+    engine = db.engine
+    key = (str(engine.url), 'substring')
+    if key not in _backends:
+        backend = None
+        with engine.connect() as conn:
+            if engine.dialect.name == 'sqlite':
+                sql = conn.execute(text(
+                    "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'spot_search'")).scalar()
+                backend = 'trigram' if sql and 'trigram' in sql else None
+            elif engine.dialect.name == 'postgresql':
+                found = conn.execute(text(
+                    "SELECT 1 FROM pg_indexes WHERE indexname = 'ix_parking_spot_substring'")).first()
+                backend = 'pg_trgm' if found else None
+        _backends[key] = backend
+    return _backends[key]
+
+
+def _match(table, fts, query, limit, where=''):
+    # Run the ranked full-text query for one table; `where` filters on the base table aliased as b
+    terms = _terms(query)
+    if not terms:
+        return []
+
+    backend = _backend()
+    if backend == 'fts5':
+        match = ' '.join(f'"{term}"*' for term in terms)
+        sql = (f'SELECT b.id FROM {fts} s JOIN "{table}" b ON b.id = s.rowid '
+               f'WHERE {fts} MATCH :match {where} ORDER BY s.rank LIMIT :limit')
+    else:
+        match = ' & '.join(f'{term}:*' for term in terms)
+        vector = POSTGRES_VECTORS[table]
+        sql = (f'SELECT b.id FROM "{table}" b '
+               f"WHERE {vector} @@ to_tsquery('simple', :match) {where} "
+               f"ORDER BY ts_rank({vector}, to_tsquery('simple', :match)) DESC, b.id LIMIT :limit")
+    return [row[0] for row in db.session.execute(text(sql), {'match': match, 'limit': limit})]
+
+
+def _escape_like(term):
+    return term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def _like(column, query):
+    return column.ilike(f'%{_escape_like(query)}%', escape='\\')
+
+
+def _substring_match(table, query, limit, where=''):
+    # Every whitespace-separated term must occur somewhere in the indexed text; `where` as in _match
+    terms = query.lower().split()
+    if not terms:
+        return []
+
+    fts, columns, expression = SUBSTRING_INDEXES[table]
+    params = {'limit': limit}
+    clauses = []
+    if _substring_backend() == 'trigram':
+        long_terms = [term for term in terms if len(term) >= TRIGRAM_LENGTH]
+        if long_terms:
+            # A quoted phrase in a trigram table matches as a substring; phrases are ANDed
+            params['match'] = ' '.join('"' + term.replace('"', '""') + '"' for term in long_terms)
+            clauses.append(f'{fts} MATCH :match')
+        for i, term in enumerate(term for term in terms if len(term) < TRIGRAM_LENGTH):
+            # Too short for a trigram lookup: checked on the rows the other terms leave, or by a scan
+            params[f'short{i}'] = term
+            clauses.append('(' + ' OR '.join(f'instr(lower(s.{column}), :short{i}) > 0' for column in columns) + ')')
+        order = 's.rank' if long_terms else 's.rowid'
+        sql = (f'SELECT b.id FROM {fts} s JOIN "{table}" b ON b.id = s.rowid '
+               f'WHERE {" AND ".join(clauses)} {where} ORDER BY {order} LIMIT :limit')
+    else:
+        for i, term in enumerate(terms):
+            params[f'term{i}'] = f'%{_escape_like(term)}%'
+            clauses.append(f"{expression} LIKE :term{i} ESCAPE '\\'")
+        sql = f'SELECT b.id FROM "{table}" b WHERE {" AND ".join(clauses)} {where} ORDER BY b.id LIMIT :limit'
+    return [row[0] for row in db.session.execute(text(sql), params)]
+
+
+def search_lot_ids(query, limit=DEFAULT_LIMIT, available_only=False):
+    """Lots whose name, address or pin code contain the query, best match first"""
+    if _backend() == 'like':
+        lots = ParkingLot.query.with_entities(ParkingLot.id).filter(or_(
+            _like(ParkingLot.prime_location_name, query),
+            _like(ParkingLot.address, query),
+            ParkingLot.pin_code.contains(query),
+        ))
+        if available_only:
+            lots = lots.filter(ParkingLot.available_spots > 0)
+        return [row.id for row in lots.order_by(ParkingLot.id).limit(limit)]
+
+    where = 'AND b.available_spots > 0' if available_only else ''
+    if _substring_backend():
+        return _substring_match('parking_lot', query, limit, where)
+    return _match('parking_lot', 'lot_search', query, limit, where)
+
+
+def search_user_ids(query, limit=DEFAULT_LIMIT):
+    """Regular users whose username or email contain the query; a numeric query also matches the user id"""
+    if _backend() == 'like':
+        users = User.query.with_entities(User.id).filter(User.role == 'user', or_(
+            _like(User.username, query), _like(User.email, query)))
+        ids = [row.id for row in users.order_by(User.id).limit(limit)]
+    elif _substring_backend():
+        ids = _substring_match('user', query, limit, "AND b.role = 'user'")
+    else:
+        ids = _match('user', 'user_search', query, limit, "AND b.role = 'user'")
+
+    if query.isdigit() and int(query) not in ids:
+        if User.query.with_entities(User.id).filter_by(id=int(query), role='user').first():
+            ids = [int(query)] + ids[:limit - 1]
+    return ids
+
+
+def search_spot_ids(query, limit=DEFAULT_LIMIT):
+    """Spots whose number contains the query; a numeric query also matches the spot id"""
+    if _backend() == 'like':
+        spots = ParkingSpot.query.with_entities(ParkingSpot.id).filter(_like(ParkingSpot.spot_number, query))
+        ids = [row.id for row in spots.order_by(ParkingSpot.id).limit(limit)]
+    elif _substring_backend():
+        ids = _substring_match('parking_spot', query, limit)
+    else:
+        ids = _match('parking_spot', 'spot_search', query, limit)
+
+    if query.isdigit() and int(query) not in ids and db.session.get(ParkingSpot, int(query)):
+        ids = [int(query)] + ids[:limit - 1]
+    return ids
@@ -3,13 +3,14 @@ Command-line helper to create a fresh SQLite database with
 demo-ready data in a single run.
 """
 from app import app, db
+from flask_migrate import upgrade
 from demo_data import seed_demo_data
 
 
 def seed_database():
     """Drop existing demo entities (except admin) and repopulate data."""
     with app.app_context():
-        db.create_all()
+        upgrade()
         seed_demo_data(force_reset=True)
 
 
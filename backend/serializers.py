@@ -0,0 +1,130 @@
+"""
+Batch serializers shared by every listing.
+
+Each serializer turns a batch of rows into JSON-ready dicts. A row is
+anything exposing the listed attributes: a column-tuple Row from
+query.with_entities(*COLUMNS) (the normal case for read-only listings, which
+skips ORM hydration entirely) or a model instance. The output holds only
+str/int/float/bool/None, with datetimes already in ISO 8601, so it can go
+to any JSON encoder; with orjson installed, FastJSONProvider makes
+jsonify() use it.
+
+    rows = db.session.query(*RESERVATION_COLUMNS).join(...).all()
+    return jsonify(serialize_reservations(rows))
+"""
+from itertools import chain
+from operator import attrgetter
+
+from flask.json.provider import DefaultJSONProvider
+
+from models import User, ParkingLot, ParkingSpot, Reservation
+
+try:
+    import orjson
+except ImportError:  # Optional: the stdlib encoder is used without it
+    orjson = None
+
+
+def _batch_serializer(fields, datetimes=(), extra=None):
+    """
+    Build serialize(rows) for (output key, row attribute) pairs.
+
+    datetimes names the output keys to render with isoformat(); extra(item)
+    may add derived keys to each dict. Rows selected with exactly the matching
+    *_COLUMNS are read positionally, anything else attribute by attribute.
+    """
+    keys = tuple(key for key, _ in fields)
+    attrs = tuple(attr for _, attr in fields)
+    getter = attrgetter(*attrs)
+    positions = [keys.index(key) for key in datetimes]
+
+    def serialize(rows):
+        rows = iter(rows)
+        first = next(rows, None)
+        if first is None:
+            return []
+        positional = getattr(first, '_fields', None) == attrs
+        result = []
+        for row in chain((first,), rows):
+            values = row if positional else getter(row)
+            if positions:
+                values = list(values)
+                for i in positions:
+                    if values[i] is not None:
+                        values[i] = values[i].isoformat()
+            item = dict(zip(keys, values))
+            if extra:
+                extra(item)
+            result.append(item)
+        return result
+    return serialize
+
+
+def _same(*names):
+    return tuple((name, name) for name in names)
+
+
+LOT_FIELDS = _same('id', 'prime_location_name', 'address', 'pin_code', 'price_per_hour',
+                   'number_of_spots', 'available_spots', 'occupied_spots')
+LOT_COLUMNS = tuple(getattr(ParkingLot, attr) for _, attr in LOT_FIELDS)
+serialize_lots = _batch_serializer(LOT_FIELDS)
+
+# The public shape: no occupied count
+LOT_SUMMARY_FIELDS = LOT_FIELDS[:-1]
+LOT_SUMMARY_COLUMNS = LOT_COLUMNS[:-1]
+serialize_lot_summaries = _batch_serializer(LOT_SUMMARY_FIELDS)
+
+SPOT_FIELDS = _same('id', 'spot_number', 'status')
+SPOT_COLUMNS = (ParkingSpot.id, ParkingSpot.spot_number, ParkingSpot.status)
+serialize_spots = _batch_serializer(SPOT_FIELDS)
+
+# Spots with their lot's name and address, from a join with parking_lot
+LOT_SPOT_FIELDS = _same('id', 'lot_id', 'spot_number', 'status') + (
+    ('lot_name', 'prime_location_name'), ('lot_address', 'address'))
+LOT_SPOT_COLUMNS = (ParkingSpot.id, ParkingSpot.lot_id, ParkingSpot.spot_number, ParkingSpot.status,
+                    ParkingLot.prime_location_name, ParkingLot.address)
+serialize_lot_spots = _batch_serializer(LOT_SPOT_FIELDS)
+
+USER_FIELDS = _same('id', 'username', 'email', 'phone_number', 'address', 'pincode', 'role', 'fleet',
+                    'created_at', 'last_visit')
+USER_COLUMNS = tuple(getattr(User, attr) for _, attr in USER_FIELDS)
+serialize_users = _batch_serializer(USER_FIELDS, datetimes=('created_at', 'last_visit'))
+
+# Admin user listings: the account basics (callers add current_spot)
+USER_SUMMARY_FIELDS = _same('id', 'username', 'email', 'created_at')
+USER_SUMMARY_COLUMNS = (User.id, User.username, User.email, User.created_at)
+serialize_user_summaries = _batch_serializer(USER_SUMMARY_FIELDS, datetimes=('created_at',))
+
+
+def _reservation_status(item):
+    item['status'] = 'completed' if item['leaving_timestamp'] else 'active'
+
+
+# Reservations with their spot's lot, from a join with parking_spot
+RESERVATION_FIELDS = _same('id', 'spot_id', 'lot_id', 'parking_timestamp', 'leaving_timestamp', 'parking_cost')
+RESERVATION_COLUMNS = (Reservation.id, Reservation.spot_id, ParkingSpot.lot_id, Reservation.parking_timestamp,
+                       Reservation.leaving_timestamp, Reservation.parking_cost)
+serialize_reservations = _batch_serializer(RESERVATION_FIELDS, datetimes=('parking_timestamp', 'leaving_timestamp'),
+                                           extra=_reservation_status)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """jsonify() through orjson when it is installed; output matches the stdlib provider's"""
+
+    def _orjson_option(self):
+        # Datetimes are passed through to default() so they keep Flask's HTTP-date rendering
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        return option | orjson.OPT_SORT_KEYS if self.sort_keys else option
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None or kwargs:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=self._orjson_option()).decode()
+
+    def response(self, *args, **kwargs):
+        # Debug mode pretty-prints, which only the stdlib encoder does
+        if orjson is None or self.compact is False or (self.compact is None and self._app.debug):
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(orjson.dumps(obj, default=self.default, option=self._orjson_option()),
+                                        mimetype=self.mimetype)
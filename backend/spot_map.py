@@ -0,0 +1,126 @@
+"""
+Compact spot-map encoding for spot listings.
+
+The regular listings send one object per spot and repeat the lot's name and
+address on every one. A client that sends Accept: application/vnd.parkindia.spot-map+json
+(or ?format=spotmap) gets each lot once instead, with its spots packed into
+three run-length encoded fields, in spot id order:
+
+    ids      [[first_id, count], ...]            runs of consecutive ids
+    numbers  [[prefix, first, count], ...]       "A1".."A40" is ["A", 1, 40]; a spot
+                                                 number without a numeric suffix is
+                                                 [number, null, 1]
+    status   "A34O2A4"                           status letter followed by run length
+
+A garage with thousands of mostly free spots comes down to a few dozen bytes
+per lot. Map responses larger than COMPRESS_MIN_SIZE are gzip-compressed
+when the client accepts it. decode_spots() turns a lot entry back into
+per-spot dicts.
+"""
+import gzip
+import json
+import re
+
+from flask import Response, request
+
+from streaming import STREAM_CHUNK_SIZE
+
+SPOT_MAP_MIMETYPE = 'application/vnd.parkindia.spot-map+json'
+COMPRESS_MIN_SIZE = 1024  # Bodies smaller than this are not worth a gzip frame
+COMPRESS_LEVEL = 5
+
+_NUMBERED = re.compile(r'^(.*?)(\d+)$')
+
+
+def wants_spot_map():
+    """True when the client asked for the compact spot-map representation"""
+    return request.args.get('format') == 'spotmap' or request.accept_mimetypes.best == SPOT_MAP_MIMETYPE
+
+
+class SpotRuns:
+    """Run-length encoder for the spots of one lot, fed in id order"""
+
+    def __init__(self):
+        self.count = 0
+        self.ids = []
+        self.numbers = []
+        self._status = []  # [letter, run length]
+
+    def add(self, spot_id, spot_number, status):
+        self.count += 1
+        ids = self.ids
+        if ids and ids[-1][0] + ids[-1][1] == spot_id:
+            ids[-1][1] += 1
+        else:
+            ids.append([spot_id, 1])
+
+        numbers = self.numbers
+        last = numbers[-1] if numbers else None
+        # Fast path: the number continues the current run, checked without the regex
+        if last and last[1] is not None and spot_number == f"{last[0]}{last[1] + last[2]}":
+            last[2] += 1
+        else:
+            match = _NUMBERED.match(spot_number or '')
+            if match and match.group(2) == str(int(match.group(2))):  # Zero-padded numbers are kept verbatim
+                numbers.append([match.group(1), int(match.group(2)), 1])
+            else:
+                numbers.append([spot_number, None, 1])
+
+        runs = self._status
+        if runs and runs[-1][0] == status:
+            runs[-1][1] += 1
+        else:
+            runs.append([status, 1])
+
+    def encode(self):
+        return {
+            'count': self.count,
+            'ids': self.ids,
+            'numbers': self.numbers,
+            'status': ''.join(f"{letter}{length}" for letter, length in self._status)
+        }
+
+
+def encode_spots(rows):
+    """Encode rows with id, spot_number and status (in id order) as one lot's spot map"""
+    runs = SpotRuns()
+    for row in rows:
+        runs.add(row.id, row.spot_number, row.status)
+    return runs.encode()
+
+
+def encode_lots(query):
+    """
+    Spot map of every lot in a query over ParkingSpot.id/lot_id/spot_number/status
+    joined with ParkingLot.prime_location_name/address, read in chunks in id order.
+    """
+    lots = {}
+    for row in query.yield_per(STREAM_CHUNK_SIZE):
+        entry = lots.get(row.lot_id)
+        if entry is None:
+            entry = lots[row.lot_id] = ({'id': row.lot_id, 'lot_name': row.prime_location_name,
+                                         'lot_address': row.address}, SpotRuns())
+        entry[1].add(row.id, row.spot_number, row.status)
+    return [{**info, **runs.encode()} for info, runs in (lots[lot_id] for lot_id in sorted(lots))]
+
+
+def decode_spots(encoded):
+    """Expand one lot's spot map back into [{'id', 'spot_number', 'status'}, ...]"""
+    ids = [first + i for first, count in encoded['ids'] for i in range(count)]
+    numbers = [prefix if first is None else f"{prefix}{first + i}"
+               for prefix, first, count in encoded['numbers'] for i in range(count)]
+    statuses = [letter for letter, count in re.findall(r'(\D)(\d+)', encoded['status'])
+                for _ in range(int(count))]
+    return [{'id': spot_id, 'spot_number': number, 'status': status}
+            for spot_id, number, status in zip(ids, numbers, statuses)]
+
+
+def spot_map_response(payload, status=200):
+    """Serialize a spot-map payload, gzip-compressed when it is large and the client accepts it"""
+    body = json.dumps(payload, separators=(',', ':')).encode()
+    response = Response(body, status=status, mimetype=SPOT_MAP_MIMETYPE)
+    if len(body) >= COMPRESS_MIN_SIZE and 'gzip' in request.accept_encodings:
+        response.set_data(gzip.compress(body, COMPRESS_LEVEL))
+        response.headers['Content-Encoding'] = 'gzip'
+    response.vary.add('Accept-Encoding')
+    return response
@@ -0,0 +1,68 @@
+"""
+Streamed JSON / NDJSON responses for large collection endpoints.
+
+Paginated endpoints can instead hand back their whole (filtered) collection
+in one response when the client asks for ?stream=1, ?format=ndjson or
+Accept: application/x-ndjson. Rows are read from a server-side cursor
+(Query.yield_per) in chunks of STREAM_CHUNK_SIZE, serialized chunk by chunk
+and written out as they are produced, so peak memory is one chunk and the
+first bytes leave before the last row is read.
+
+Streamed responses are never cached: caching them would mean buffering the
+whole body, which is what streaming avoids.
+"""
+import json
+from itertools import islice
+
+from flask import Response, request, stream_with_context
+
+STREAM_CHUNK_SIZE = 500
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+
+def wants_ndjson():
+    """True when the client asked for newline-delimited JSON"""
+    return request.args.get('format') == 'ndjson' or request.accept_mimetypes.best == NDJSON_MIMETYPE
+
+
+def wants_stream():
+    """True when the client asked for the whole collection as a stream instead of one page"""
+    return request.args.get('stream') in ('1', 'true') or wants_ndjson()
+
+
+def _chunks(rows, size):
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def stream_collection(query, serialize, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Stream every row of an ordered query as a JSON array, or as NDJSON when requested.
+
+    serialize(chunk) receives a list of up to chunk_size rows and returns their
+    dicts, so per-chunk lookups (e.g. current_spots) stay one query per chunk.
+    """
+    ndjson = wants_ndjson()
+    rows = query.yield_per(chunk_size)
+
+    def generate():
+        if not ndjson:
+            yield '['
+        first = True
+        for chunk in _chunks(rows, chunk_size):
+            items = serialize(chunk)
+            if ndjson:
+                yield ''.join(json.dumps(item) + '\n' for item in items)
+            else:
+                # One dumps per chunk; strip its brackets so chunks join into a single array
+                yield ('' if first else ',') + json.dumps(items)[1:-1]
+            first = False
+        if not ndjson:
+            yield ']'
+
+    return Response(stream_with_context(generate()),
+                    mimetype=NDJSON_MIMETYPE if ndjson else 'application/json')
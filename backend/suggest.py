@@ -0,0 +1,226 @@
+"""
+In-memory prefix index behind /api/search/suggest.
+
+Holds one sorted array of lowercase keys for lot names, areas and pin codes,
+so a completion is a binary search plus a short forward walk and never
+touches the database. Every word of a name or area is indexed as its own
+key ("plaza" completes "Zebra Plaza").
+
+start(app) loads the index in a background thread when the app is created.
+Admin edits patch it in place and are announced on the cache invalidation
+channel, so every other worker patches its own copy; bulk writes (imports,
+setup) announce a rebuild instead. A reload always runs in the background,
+one at a time per process, while suggest() keeps serving the current copy.
+While a worker's subscription is down it may miss announcements, so it
+also reloads whenever its copy is older than SUGGEST_MAX_AGE.
+"""
+import bisect
+import logging
+import os
+import re
+import threading
+import time
+
+from cache import ensure_invalidation_listener, publish_change, register_invalidation_hook
+from models import ParkingLot
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SUGGESTIONS = 8
+MAX_SUGGESTIONS = 25
+# Seconds an index may serve without the invalidation subscription before it is rebuilt
+SUGGEST_MAX_AGE = float(os.getenv('SUGGEST_MAX_AGE', 60))
+# Kinds in the order they are listed when two suggestions share a key
+KINDS = ('lot', 'area', 'pin_code')
+
+
+def _normalize(value):
+    return ' '.join(re.findall(r'\w+', (value or '').lower()))
+
+
+def lot_terms(name, address, pin_code):
+    """(kind, display text) pairs a lot is suggested under"""
+    terms = set()
+    if name and name.strip():
+        terms.add(('lot', name.strip()))
+    # "123 Main Street, Downtown" -> area "Downtown"; an address without commas is its own area
+    parts = [part.strip() for part in (address or '').split(',') if part.strip()]
+    for part in parts[1:] or parts:
+        terms.add(('area', part))
+    if pin_code and pin_code.strip():
+        terms.add(('pin_code', pin_code.strip()))
+    return terms
+
+
+class SuggestIndex:
+    """Sorted prefix index over lot names, areas and pin codes"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._keys = []   # sorted (key, kind rank, text)
+        self._lots = {}   # (kind, text) -> set of lot ids
+        self._terms = {}  # lot_id -> terms currently indexed for it
+        self._built_at = None  # monotonic time of the last full load; None means stale
+        self._generation = 0   # bumped by every patch and invalidate(); fences off an in-flight rebuild
+        self._app = None
+        self._reloading = None  # pid of the process whose background reload is running
+
+    def start(self, app):
+        """Load the index in the background now, and again whenever it goes stale"""
+        self._app = app
+        self._schedule_reload()
+
+    def rebuild(self):
+        """Reload every lot from parking_lot (needs an app context); False when a change raced the load"""
+        with self._lock:
+            generation = self._generation
+        rows = ParkingLot.query.with_entities(
+            ParkingLot.id, ParkingLot.prime_location_name, ParkingLot.address, ParkingLot.pin_code).all()
+        lots, terms = {}, {}
+        for lot_id, name, address, pin_code in rows:
+            terms[lot_id] = lot_terms(name, address, pin_code)
+            for term in terms[lot_id]:
+                lots.setdefault(term, set()).add(lot_id)
+        keys = sorted(entry for term in lots for entry in self._entries(term))
+
+        with self._lock:
+            self._keys, self._lots, self._terms = keys, lots, terms
+            # A patch or invalidation during the load may have been overwritten; reload again
+            self._built_at = time.monotonic() if self._generation == generation else None
+            return self._built_at is not None
+
+    def invalidate(self, _=None):
+        """Mark the index stale and reload it in the background"""
+        with self._lock:
+            self._generation += 1
+            self._built_at = None
+        self._schedule_reload()
+
+    def announce_rebuild(self):
+        """Have every worker reload the index after a bulk write (imports, setup)"""
+        self.invalidate()
+        self._announce('rebuild')
+
+    def add_lot(self, lot):
+        """Index a new or edited lot in every worker, replacing whatever was indexed for it before"""
+        fields = {'name': lot.prime_location_name, 'address': lot.address, 'pin_code': lot.pin_code}
+        self._patch(lot.id, lot_terms(*fields.values()))
+        self._announce({'lot_id': lot.id, **fields})
+
+    def remove_lot(self, lot_id):
+        """Drop a deleted lot from the index of every worker"""
+        self._patch(lot_id, None)
+        self._announce({'lot_id': lot_id, 'deleted': True})
+
+    def apply_change(self, change):
+        """Invalidation hook: replay a change announced by another worker"""
+        if not isinstance(change, dict):
+            self.invalidate()  # A rebuild, or a resubscribe after possibly missed messages
+        elif self._built_at is None:
+            return  # Not loaded yet (or already stale); the pending load reads the change from the database
+        elif change.get('deleted'):
+            self._patch(change['lot_id'], None)
+        else:
+            self._patch(change['lot_id'], lot_terms(change['name'], change['address'], change['pin_code']))
+
+    def suggest(self, prefix, limit=DEFAULT_SUGGESTIONS):
+        """Completions for a prefix, in key order, each with the ids of the lots behind it"""
+        prefix = _normalize(prefix)
+        if not prefix:
+            return []
+        self._check_age()
+
+        results, seen = [], set()
+        with self._lock:
+            i = bisect.bisect_left(self._keys, (prefix,))
+            while i < len(self._keys) and len(results) < limit:
+                key, rank, text = self._keys[i]
+                if not key.startswith(prefix):
+                    break
+                i += 1
+                term = (KINDS[rank], text)
+                if term in seen:
+                    continue
+                seen.add(term)
+                results.append({'text': text, 'type': term[0], 'lot_ids': sorted(self._lots[term])})
+        return results
+
+    def __len__(self):
+        with self._lock:
+            return len(self._keys)
+
+    def _check_age(self):
+        # Stale copies are reloaded in the background; this request is answered from the current one
+        built_at = self._built_at
+        if built_at is None or (not ensure_invalidation_listener()
+                                and time.monotonic() - built_at > SUGGEST_MAX_AGE):
+            self._schedule_reload()
+
+    def _schedule_reload(self):
+        # Single flight: one reload thread per process, however many callers find the index stale
+        with self._lock:
+            if self._app is None or self._reloading == os.getpid():
+                return
+            self._reloading = os.getpid()
+        threading.Thread(target=self._reload, name='suggest-index', daemon=True).start()
+
+    def _reload(self):
+        fresh = True
+        try:
+            with self._app.app_context():
+                fresh = self.rebuild()
+        except Exception as e:
+            # Left as it was; the next stale suggest() tries again
+            logger.warning(f"Suggest index reload failed: {e}")
+        finally:
+            with self._lock:
+                self._reloading = None
+        if not fresh:
+            self._schedule_reload()
+
+    def _patch(self, lot_id, terms):
+        with self._lock:
+            self._generation += 1
+            self._drop(lot_id)
+            if terms is None:
+                return
+            self._terms[lot_id] = terms
+            for term in terms:
+                holders = self._lots.setdefault(term, set())
+                if not holders:
+                    for entry in self._entries(term):
+                        bisect.insort(self._keys, entry)
+                holders.add(lot_id)
+
+    def _announce(self, change):
+        try:
+            publish_change(suggest=change)
+        except Exception as e:
+            # Redis is down, so the other workers' subscriptions are too and SUGGEST_MAX_AGE applies
+            logger.warning(f"Suggest index change not broadcast: {e}")
+
+    def _entries(self, term):
+        # One key per word start, so "plaza" and "zebra plaza" both reach "Zebra Plaza"
+        kind, text = term
+        words = _normalize(text).split()
+        return [(' '.join(words[i:]), KINDS.index(kind), text) for i in range(len(words))]
+
+    def _drop(self, lot_id):
+        # Caller holds the lock
+        for term in self._terms.pop(lot_id, ()):
+            holders = self._lots.get(term)
+            if holders is None:
+                continue
+            holders.discard(lot_id)
+            if holders:
+                continue
+            del self._lots[term]
+            for entry in self._entries(term):
+                i = bisect.bisect_left(self._keys, entry)
+                if i < len(self._keys) and self._keys[i] == entry:
+                    del self._keys[i]
+
+
+# Shared index instance for the application process
+suggest_index = SuggestIndex()
+register_invalidation_hook('suggest', suggest_index.apply_change)
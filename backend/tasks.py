@@ -147,6 +147,14 @@ celery.conf.beat_schedule = {
         'task': 'tasks.dispatch_scheduled_report',
         'schedule': crontab(minute='*/2'),  # Demo requirement: trigger every 2 minutes
     },
+    'reconcile-lot-counters': {
+        'task': 'tasks.reconcile_lot_counters_task',
+        'schedule': crontab(minute='*/10'),  # Repair any drift in per-lot availability counters
+    },
+    'reconcile-availability': {
+        'task': 'tasks.reconcile_availability_task',
+        'schedule': crontab(minute='*'),  # Bounds how long the Redis free counts can drift
+    },
 }
 
 celery.conf.timezone = 'UTC'
@@ -365,3 +373,67 @@ def dispatch_scheduled_report(self):
         return {'status': 'queued', 'recipients': admin_emails}
     except Exception as exc:
         return {'status': 'error', 'message': str(exc)}
+
+
+@celery.task(bind=True)
+def reconcile_lot_counters_task(self):
+    """Periodic task that recounts spots and repairs drifted per-lot availability counters."""
+    try:
+        from app import app
+        from cache import cache_invalidate
+        from inventory import reconcile_lot_counters
+        from lot_cache import INVENTORY_NAMESPACES
+
+        with app.app_context():
+            repaired = reconcile_lot_counters()
+            if repaired:
+                # Cached lot summaries may hold the drifted counts
+                cache_invalidate(*INVENTORY_NAMESPACES)
+
+        return {'status': 'success', 'lots_repaired': repaired}
+    except Exception as exc:
+        return {'status': 'error', 'message': str(exc)}
+
+
+@celery.task(bind=True)
+def reconcile_availability_task(self):
+    """Periodic task that rewrites the Redis free-spot hash from the parking_spot table."""
+    try:
+        from app import app
+        from availability import reconcile_availability
+
+        with app.app_context():
+            drifted = reconcile_availability()
+
+        return {'status': 'success', 'lots_drifted': drifted}
+    except Exception as exc:
+        return {'status': 'error', 'message': str(exc)}
+
+
+@celery.task(bind=True)
+def import_lots_task(self, path, fmt):
+    """Import a staged CSV/NDJSON lot file in chunks, publishing progress through the task state."""
+    try:
+        from app import app
+        from availability import reset_availability
+        from cache import cache_invalidate
+        from lot_cache import INVENTORY_NAMESPACES
+        from lot_import import import_lots
+        from suggest import suggest_index
+
+        def report_progress(summary):
+            self.update_state(state='PROGRESS', meta=summary)
+
+        with app.app_context():
+            with open(path, encoding='utf-8-sig', newline='') as stream:
+                summary = import_lots(stream, fmt, progress=report_progress)
+            cache_invalidate(*INVENTORY_NAMESPACES)
+            reset_availability()
+            suggest_index.announce_rebuild()
+
+        return {'status': 'success', **summary}
+    except Exception as exc:
+        return {'status': 'error', 'message': str(exc)}
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
@@ -0,0 +1,159 @@
+"""
+Per-process cache of verified JWT payloads.
+
+verify_token() keeps the payload of each token it has verified, keyed by
+the token's SHA-256 digest, until the token's exp; a repeat request costs
+one digest and a dict lookup instead of a full jwt.decode. The cache is a
+bounded LRU (TOKEN_CACHE_SIZE entries) and expired tokens drop out on
+their own.
+
+Revocation: logging out writes auth:revoked:<digest> to Redis for the rest
+of the token's lifetime and announces the digest on the cache invalidation
+channel, whose subscriber evicts it from every other worker's cache. A
+full verification checks that denylist. Payloads are only cached while
+that subscription is live, so a worker that may have missed a revocation
+verifies every request in full.
+
+If Redis is down the denylist check is skipped rather than failing every
+request: a short circuit breaker opens while the subscription is
+reconnecting, or for DENYLIST_RETRY seconds after a failed check, and the
+outage is logged once.
+"""
+import hashlib
+import logging
+import math
+import os
+import threading
+import time
+
+from cache import (ensure_invalidation_listener, invalidation_subscriber, publish_change, redis_client,
+                   register_invalidation_hook)
+from config import Config
+from local_cache import LocalCache
+
+logger = logging.getLogger(__name__)
+
+REVOKED_PREFIX = "auth:revoked"
+DENYLIST_RETRY = 5  # Seconds the denylist is skipped after a failed check
+
+# TOKEN_CACHE_SIZE=0 turns the cache off; no entry outlives a token's maximum lifetime
+token_cache = LocalCache(
+    maxsize=int(os.getenv('TOKEN_CACHE_SIZE', 10000)),
+    ttl=Config.JWT_ACCESS_TOKEN_EXPIRES
+)
+
+# Outcomes of verify_token(): count and total seconds spent, per outcome
+_OUTCOMES = ('hit', 'miss', 'invalid', 'revoked')
+_stats_lock = threading.Lock()
+_stats = {outcome: [0, 0.0] for outcome in _OUTCOMES}
+# Circuit breaker over the denylist check: skipped until 'until' (monotonic), one log per outage
+_breaker = {'until': 0.0, 'logged': False}
+
+
+def token_digest(token):
+    """Cache and denylist key of a token; raw tokens are never kept"""
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+
+def record_auth(outcome, started):
+    """Count one verification and the time since perf_counter() value started"""
+    elapsed = time.perf_counter() - started
+    with _stats_lock:
+        entry = _stats[outcome]
+        entry[0] += 1
+        entry[1] += elapsed
+
+
+def token_cache_stats():
+    """Hit rate and mean verification time per outcome for this process"""
+    with _stats_lock:
+        stats = {outcome: tuple(entry) for outcome, entry in _stats.items()}
+    lookups = stats['hit'][0] + stats['miss'][0]
+    total = sum(count for count, _ in stats.values())
+    return {
+        'enabled': bool(token_cache.maxsize),
+        'listening': invalidation_subscriber.ready.is_set(),
+        'denylist_available': not _denylist_down(),
+        'size': len(token_cache),
+        'max_size': token_cache.maxsize,
+        'evictions': token_cache.evictions,
+        'hit_rate': round(stats['hit'][0] / lookups, 4) if lookups else None,
+        'mean_auth_us': round(sum(seconds for _, seconds in stats.values()) / total * 1e6, 1) if total else None,
+        'outcomes': {
+            outcome: {
+                'count': count,
+                'mean_us': round(seconds / count * 1e6, 1) if count else None
+            } for outcome, (count, seconds) in stats.items()
+        }
+    }
+
+
+def _evict(digest):
+    # Invalidation hook: a token revoked by another worker, or None after a resubscribe,
+    # when revocations may have been missed and the whole cache is suspect
+    if digest is None:
+        token_cache.clear()
+    else:
+        token_cache.delete(digest)
+
+
+register_invalidation_hook('revoked', _evict)
+
+
+def _caching_enabled():
+    """True when the cache is configured and the invalidation subscription is live"""
+    return bool(token_cache.maxsize) and ensure_invalidation_listener()
+
+
+def _denylist_down():
+    return invalidation_subscriber.down or time.monotonic() < _breaker['until']
+
+
+def _log_outage(reason):
+    if not _breaker['logged']:
+        _breaker['logged'] = True
+        logger.warning(f"Token denylist unavailable, skipping revocation checks: {reason}")
+
+
+def cached_payload(digest):
+    """Payload of an already verified, unexpired and unrevoked token, or None"""
+    if not _caching_enabled():
+        return None
+    payload = token_cache.get(digest)
+    if payload is not None and payload['exp'] <= time.time():
+        return None  # The wall clock moved past exp before the entry's own expiry
+    return payload
+
+
+def admit(digest, payload):
+    """
+    Check a freshly verified token against the denylist and cache its payload until
+    exp; False when it was revoked. A Redis outage does not lock everyone out.
+    """
+    if _denylist_down():
+        # Don't wait on a Redis that is known to be down; nothing is cached meanwhile either
+        _log_outage("invalidation subscription disconnected")
+        return True
+    # Generation first: a revocation landing during the denylist check then fences off the write
+    generation = token_cache.generation
+    try:
+        if redis_client.exists(f"{REVOKED_PREFIX}:{digest}"):
+            return False
+    except Exception as e:
+        _breaker['until'] = time.monotonic() + DENYLIST_RETRY
+        _log_outage(e)
+        return True
+    if _breaker['logged']:
+        _breaker['logged'] = False
+        logger.info("Token denylist reachable again")
+    if _caching_enabled():
+        token_cache.set(digest, payload, ttl=payload['exp'] - time.time(), generation=generation)
+    return True
+
+
+def revoke(digest, expires):
+    """Reject a token everywhere for the rest of its lifetime (expires is its epoch exp)"""
+    ttl = max(1, math.ceil(expires - time.time()))
+    redis_client.set(f"{REVOKED_PREFIX}:{digest}", 1, ex=ttl)
+    token_cache.delete(digest)
+    publish_change(revoked=digest)